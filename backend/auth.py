@@ -1,12 +1,15 @@
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Request, status
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import sqlite3
+from functools import lru_cache
 from typing import Optional
-from core.config import SECRET_KEY, ALGORITHM, DATABASE_URL, pwd_context
+from core.config import SECRET_KEY, ALGORITHM, DATABASE_URL, PASSWORD_HASH_SCHEMES
 from model import UserCreate, User
 from database import get_db
+from core.write_queue import connect, execute_write
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
@@ -15,11 +18,17 @@ class TokenData:
     def __init__(self, email: Optional[str] = None):
         self.email = email
 
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context, passlib and bcrypt are only loaded on first use"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=PASSWORD_HASH_SCHEMES, deprecated="auto")
+
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -43,7 +52,7 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def get_user_by_id(user_id: int):
-    conn = sqlite3.connect(DATABASE_URL)
+    conn = connect(DATABASE_URL)
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
     user = cursor.fetchone()
@@ -65,19 +74,16 @@ def get_user_by_id(user_id: int):
     return None
 
 def store_refresh_token(user_id: int, token: str, expires_at: datetime):
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
+    execute_write(_store_refresh_token, user_id, token, expires_at)
+
+def _store_refresh_token(cursor, user_id: int, token: str, expires_at: datetime):
     cursor.execute("""
         INSERT INTO refresh_tokens (user_id, token, expires_at)
         VALUES (?, ?, ?)
     """, (user_id, token, expires_at))
-    
-    conn.commit()
-    conn.close()
 
 def verify_refresh_token(token: str):
-    conn = sqlite3.connect(DATABASE_URL)
+    conn = connect(DATABASE_URL)
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -91,18 +97,14 @@ def verify_refresh_token(token: str):
     return result[0] if result else None
 
 def revoke_refresh_token(token: str):
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    
+    execute_write(_revoke_refresh_token, token)
+
+def _revoke_refresh_token(cursor, token: str):
     cursor.execute("DELETE FROM refresh_tokens WHERE token = ?", (token,))
-    conn.commit()
-    conn.close()
 
 # Authentication dependency
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db = Depends(get_db)
-):
+def resolve_token_user(token: str, db) -> dict:
+    """User of a bearer token, raises the HTTPException get_current_user answers with"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -110,7 +112,7 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -130,7 +132,42 @@ async def get_current_user(
 
     return user
 
-# Role-based access control
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db = Depends(get_db)
+):
+    # Middleware may have resolved this request's token already, see get_scope_user
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    return resolve_token_user(credentials.credentials, db)
+
+def _lookup_token_user(token: str) -> Optional[dict]:
+    db = connect(DATABASE_URL)
+    try:
+        return resolve_token_user(token, db)
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+async def get_scope_user(scope) -> Optional[dict]:
+    """User of an ASGI request's bearer token for middleware, None if it does not authenticate.
+
+    The lookup runs in the threadpool once per request, the result is kept in
+    the request state for later middleware and get_current_user.
+    """
+    state = scope.setdefault("state", {})
+    if "user" not in state:
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        user = None
+        if scheme.lower() == "bearer" and token:
+            user = await run_in_threadpool(_lookup_token_user, token)
+        state["user"] = user
+    return state["user"]
+
 def require_role(required_role: str):
     def role_checker(current_user: dict = Depends(get_current_user)):
         if current_user["role"] != required_role and current_user["role"] != "admin":
@@ -142,7 +179,6 @@ def require_role(required_role: str):
     return role_checker
 
 def authenticate_user(email: str, password: str, db) -> Optional[User]:
-    print("authenticate_user", email, password, db)
     cursor = db.cursor()
     cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
     user_row = cursor.fetchone()
@@ -167,14 +203,33 @@ def authenticate_user(email: str, password: str, db) -> Optional[User]:
 def create_user(user: UserCreate, db) -> User:
     """Create a new user in the database if username/email is unique."""
 
+    hashed_password = get_password_hash(user.password)
+    user_id = execute_write(_insert_user, user, hashed_password)
+    if user_id is None:
+        return None  # User with email or username already exists
+
     cursor = db.cursor()
 
-    # Check for existing email or username
+    # Fetch full row to return
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+
+    return User(
+        id=row[0],
+        email=row[1],
+        username=row[2],
+        full_name=row[4],
+        is_active=row[5],
+        is_verified=row[6],
+        role=row[7],
+        created_at=row[8],
+    )
+
+def _insert_user(cursor, user: UserCreate, hashed_password: str) -> Optional[int]:
+    # Check for existing email or username, inside the write transaction so two signups cannot race
     cursor.execute("SELECT * FROM users WHERE email = ? OR username = ?", (user.email, user.username))
     if cursor.fetchone():
-        return None  # User with email or username already exists
-
-    hashed_password = pwd_context.hash(user.password)
+        return None
 
     cursor.execute("""
         INSERT INTO users (email, username, hashed_password, full_name, is_active, is_verified, role)
@@ -189,24 +244,7 @@ def create_user(user: UserCreate, db) -> User:
         "user"      # default role
     ))
 
-    db.commit()
-
-    user_id = cursor.lastrowid
-
-    # Fetch full row to return
-    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    row = cursor.fetchone()
-
-    return User(
-        id=row[0],
-        email=row[1],
-        username=row[2],
-        full_name=row[4],
-        is_active=row[5],
-        is_verified=row[6],
-        role=row[7],
-        created_at=row[8],
-    )
+    return cursor.lastrowid
 
 def get_user_by_email(email: str, db):
     cursor = db.cursor()
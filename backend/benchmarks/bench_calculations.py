@@ -0,0 +1,103 @@
+# File: benchmarks/bench_calculations.py
+"""Timing of the calculation checks on a synthetic report.
+
+Builds a network of --totals summations with --items items each and stores a
+report with one tagged block per concept in a throwaway database, with
+--broken percent of the totals off. Prints the time to compile the network,
+to read the facts and to check every summation, and fails if the breakage is
+not found exactly or a warm validation misses the --budget-ms target.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_calculations --totals 2500 --items 3
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic_report(totals: int, items: int, broken: float, seed: int):
+    rng = random.Random(seed)
+    arcs, blocks = [], []
+    broken_totals = set(rng.sample(range(totals), round(totals * broken / 100)))
+    for t in range(totals):
+        total = f"esrs:SyntheticTotal{t}"
+        values = [round(rng.uniform(1, 50000), 1) for _ in range(items)]
+        for i, value in enumerate(values):
+            item = f"esrs:SyntheticItem{t}x{i}"
+            arcs.append((total, item, 1.0))
+            blocks.append((f"Scope {i + 1} emissions in 2024 were {value:,.1f} tCO2eq.", [item]))
+        reported = sum(values) + (rng.choice([-1, 1]) * rng.uniform(10, 1000) if t in broken_totals else 0)
+        blocks.append((f"Total emissions for 2024: {reported:,.1f} tCO2eq.", [total]))
+    rng.shuffle(blocks)
+    return arcs, blocks, len(broken_totals)
+
+
+def timed(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--totals", type=int, default=2500)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--broken", type=float, default=1.0, help="percent of totals that do not add up")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # The app uses a relative path for auth.db, so the database is created in a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="esrs-calc-"))
+    sys.path.insert(0, BACKEND_DIR)
+    import database
+    from core.calculations import CalculationNetwork, compile_network, validate_calculations
+    from core.write_queue import stop_write_queue
+    from model import ReportBlock, ReportDocument
+
+    arcs, blocks, expected = synthetic_report(args.totals, args.items, args.broken, args.seed)
+    database.init_db()
+    now = datetime.now().isoformat()
+    report = ReportDocument(id=str(uuid.uuid4()), title="calculations", created_at=now, updated_at=now, blocks=[
+        ReportBlock(id=str(uuid.uuid4()), content=content, type="paragraph", tags=tags) for content, tags in blocks
+    ])
+    _, store_ms = timed(lambda: database.create_report(report, 1, None), 1)
+    stop_write_queue()
+
+    db = database.connect()
+    network, compile_ms = timed(lambda: CalculationNetwork(arcs), 1)
+    facts, read_ms = timed(lambda: database.get_report_facts(report.id, 1, db), args.repeat)
+    result, check_ms = timed(lambda: network.check(facts), args.repeat)
+    compile_network(tuple(arcs))
+    _, validate_ms = timed(lambda: validate_calculations(database.get_report_facts(report.id, 1, db), arcs), args.repeat)
+    db.close()
+
+    print(f"facts {result['facts']}  summations {result['summations']}  checked {result['checked']}  "
+          f"inconsistent {len(result['inconsistencies'])} (expected {expected})")
+    print(f"store report      {store_ms:8.2f} ms (numbers parsed on write)")
+    print(f"compile network   {compile_ms:8.2f} ms (once per network)")
+    print(f"read facts        {read_ms:8.2f} ms")
+    print(f"check summations  {check_ms:8.2f} ms")
+    print(f"validate (warm)   {validate_ms:8.2f} ms  budget {args.budget_ms:.0f} ms")
+
+    if len(result["inconsistencies"]) != expected or result["duplicates"]:
+        sys.exit("calculation check did not find exactly the broken totals")
+    if validate_ms > args.budget_ms:
+        sys.exit("validation is over budget")
+
+
+if __name__ == "__main__":
+    main()
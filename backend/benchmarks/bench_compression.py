@@ -0,0 +1,127 @@
+# File: benchmarks/bench_compression.py
+"""DB size and read/write throughput with and without block compression.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compression --reports 200
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+
+import core.compression as compression
+from core.segmenter import segment_lines, iter_text_lines
+from core.write_queue import stop_write_queue
+from database import init_reports_db, create_report, get_reports_by_user
+from model import ReportBlock, ReportDocument
+from benchmarks.corpus import report_text
+
+
+def synthetic_report(seed: int, size_bytes: int) -> ReportDocument:
+    text = report_text(size_bytes, seed=seed, wrap=90)
+    return ReportDocument(
+        id=str(uuid.uuid4()),
+        title=f"Sustainability statement {seed}",
+        created_at="",
+        updated_at="",
+        blocks=[
+            ReportBlock(id=str(uuid.uuid4()), content=content, type=block_type)
+            for block_type, content in segment_lines(iter_text_lines(text))
+        ],
+    )
+
+
+def write_reports(db, reports) -> float:
+    start = time.perf_counter()
+    for report in reports:
+        create_report(report, 1, db)
+    return time.perf_counter() - start
+
+
+def read_reports(db) -> float:
+    start = time.perf_counter()
+    get_reports_by_user(1, db)
+    return time.perf_counter() - start
+
+
+def codec_throughput(db, reports) -> dict:
+    """Raw encode/decode speed of block content, without SQL"""
+    cursor = db.cursor()
+    contents = [b.content for r in reports for b in r.blocks]
+    size_mb = sum(len(c.encode("utf-8")) for c in contents) / 1024 / 1024
+
+    start = time.perf_counter()
+    encoded = [compression.encode_content(c, cursor) for c in contents]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for codec, value in encoded:
+        compression.decode_content(codec, value, cursor)
+    decode_seconds = time.perf_counter() - start
+
+    return {"encode": size_mb / encode_seconds, "decode": size_mb / decode_seconds}
+
+
+def db_size(db) -> int:
+    db.execute("VACUUM")
+    page_count = db.execute("PRAGMA page_count").fetchone()[0]
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def run(report_count: int, report_kb: int):
+    corpus = [synthetic_report(seed, report_kb * 1024) for seed in range(report_count)]
+    extra = [synthetic_report(report_count + seed, report_kb * 1024) for seed in range(report_count // 4 or 1)]
+    content_mb = sum(len(b.content.encode("utf-8")) for r in extra for b in r.blocks) / 1024 / 1024
+    results = {}
+
+    for mode in ("none", "zstd"):
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            compression.BLOCK_COMPRESSION = "none"
+            init_reports_db()
+            db = sqlite3.connect("auth.db")
+
+            # Existing rows are written raw, then migrated: the upgrade path for a live database
+            write_reports(db, corpus)
+            migrated = 0
+            if mode == "zstd":
+                compression.BLOCK_COMPRESSION = "zstd"
+                compression.train_dictionary(db)
+                migrated = compression.migrate_block_content(db)
+
+            write_seconds = write_reports(db, extra)
+            read_seconds = read_reports(db)
+            if mode == "zstd":
+                results["codec"] = codec_throughput(db, corpus)
+            results[mode] = {
+                "size": db_size(db),
+                "migrated": migrated,
+                "write": content_mb / write_seconds,
+                "read": read_seconds,
+            }
+            db.close()
+            # The writer keeps its connection to this directory's auth.db, the next mode needs a fresh one
+            stop_write_queue()
+
+    raw, packed = results["none"], results["zstd"]
+    print(f"corpus:        {report_count} reports of ~{report_kb} KB")
+    print(f"db size raw:   {raw['size'] / 1024 / 1024:.1f} MB")
+    print(f"db size zstd:  {packed['size'] / 1024 / 1024:.1f} MB "
+          f"({100 * (1 - packed['size'] / raw['size']):.0f}% smaller, {packed['migrated']} rows migrated)")
+    print(f"write raw:     {raw['write']:.1f} MB/s of block content")
+    print(f"write zstd:    {packed['write']:.1f} MB/s of block content")
+    print(f"zstd encode:   {results['codec']['encode']:.0f} MB/s, decode {results['codec']['decode']:.0f} MB/s")
+    print(f"read all raw:  {raw['read'] * 1000:.0f} ms")
+    print(f"read all zstd: {packed['read'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=100)
+    parser.add_argument("--report-kb", type=int, default=64)
+    args = parser.parse_args()
+    run(args.reports, args.report_kb)
@@ -0,0 +1,126 @@
+# File: benchmarks/bench_export.py
+"""Peak memory of exporting a library through /reports versus the NDJSON export.
+
+Seeds one user with --reports text reports in a throwaway database, then
+requests GET /api/files/reports and GET /api/files/export under tracemalloc.
+The response body is counted and dropped as it is sent, so the peak is what
+the server holds, not the client.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_export --reports 200,800 --report-kb 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark-password"
+
+
+async def asgi_get(app, path: str, token: str) -> int:
+    """Run a GET through the app and return the body size, discarding the bytes"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("benchmark", 80),
+    }
+    size = 0
+    status = None
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # StreamingResponse listens for a disconnect while it sends
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal size, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    if status != 200:
+        raise RuntimeError(f"GET {path} returned {status}")
+    return size
+
+
+async def measure(app, path: str, token: str) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = await asgi_get(app, path, token)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes": size, "seconds": elapsed, "peak": peak}
+
+
+async def run(args):
+    # The app uses relative paths for auth.db and uploads/, so it is imported from a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="esrs-export-"))
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.update(USER_UPLOAD_RATE="1e6", USER_UPLOAD_BURST="1000000", USER_BYTES_RATE="1e12")
+
+    import httpx
+    from main import app
+    from benchmarks.corpus import report_text
+
+    print(f"{'reports':>8} {'endpoint':<8} {'body MiB':>9} {'seconds':>8} {'peak MiB':>9}")
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark",
+                                     timeout=None) as client:
+            seeded = 0
+            for user, total in enumerate(args.reports):
+                email = f"export{user}@example.com"
+                await client.post("/register", json={"email": email, "username": f"export{user}", "password": PASSWORD})
+                response = await client.post("/login", json={"email": email, "password": PASSWORD})
+                token = response.json()["access_token"]
+                headers = {"Authorization": f"Bearer {token}"}
+                for i in range(total):
+                    response = await client.post(
+                        "/api/files/upload-text",
+                        json={"text": report_text(args.report_kb * 1024, seed=seeded + i), "title": f"export {i}"},
+                        headers=headers,
+                    )
+                    response.raise_for_status()
+                seeded += total
+
+                for name, path in (("list", "/api/files/reports"), ("export", "/api/files/export")):
+                    result = await measure(app, path, token)
+                    print(f"{total:>8} {name:<8} {result['bytes'] / 2**20:9.1f} {result['seconds']:8.2f} "
+                          f"{result['peak'] / 2**20:9.1f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", default="100,400", help="comma-separated library sizes, one user each")
+    parser.add_argument("--report-kb", type=int, default=32)
+    args = parser.parse_args()
+    args.reports = [int(value) for value in args.reports.split(",")]
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# File: benchmarks/corpus.py
+"""Synthetic ESRS sustainability statements for benchmarks.
+
+Generates plain text, PDF and DOCX reports of a configurable size from a fixed
+seed, so runs are reproducible without customer files. Run from the backend
+directory to write a corpus to disk:
+
+    python -m benchmarks.corpus --out /tmp/esrs-corpus --sizes 64,512,4096
+"""
+import argparse
+import os
+import random
+import textwrap
+from io import BytesIO
+from typing import List
+
+DISCLOSURES = [
+    ("ESRS 2", "BP-1", "General basis for preparation of sustainability statements"),
+    ("ESRS 2", "GOV-1", "The role of the administrative, management and supervisory bodies"),
+    ("ESRS 2", "SBM-3", "Material impacts, risks and opportunities"),
+    ("ESRS E1", "E1-1", "Transition plan for climate change mitigation"),
+    ("ESRS E1", "E1-5", "Energy consumption and mix"),
+    ("ESRS E1", "E1-6", "Gross Scopes 1, 2, 3 and Total GHG emissions"),
+    ("ESRS E2", "E2-4", "Pollution of air, water and soil"),
+    ("ESRS E3", "E3-4", "Water consumption"),
+    ("ESRS E4", "E4-5", "Impact metrics related to biodiversity and ecosystems change"),
+    ("ESRS E5", "E5-5", "Resource outflows"),
+    ("ESRS S1", "S1-6", "Characteristics of the undertaking's employees"),
+    ("ESRS S1", "S1-14", "Health and safety metrics"),
+    ("ESRS S2", "S2-1", "Policies related to value chain workers"),
+    ("ESRS G1", "G1-1", "Business conduct policies and corporate culture"),
+]
+
+SENTENCES = [
+    "The undertaking reports gross Scope 1 greenhouse gas emissions of {n} tCO2e for the reporting year.",
+    "Scope 2 location-based emissions amounted to {n} tCO2e, compared to {m} tCO2e in the prior year.",
+    "Total energy consumption from own operations was {n} MWh, of which {p}% came from renewable sources.",
+    "The reduction was mainly driven by fleet electrification and process efficiency measures at our main sites.",
+    "Water withdrawal in areas at high water stress decreased to {n} m3 following the commissioning of closed-loop cooling.",
+    "The administrative, management and supervisory bodies review material impacts, risks and opportunities at least annually.",
+    "The undertaking had {n} employees at the end of the reporting period, of whom {p}% were women.",
+    "The rate of recordable work-related accidents was {r} per million hours worked.",
+    "Policies are aligned with the OECD Guidelines for Multinational Enterprises and the UN Guiding Principles.",
+    "Our transition plan is compatible with limiting global warming to 1.5 degrees Celsius in line with the Paris Agreement.",
+    "The double materiality assessment was updated with input from affected stakeholders and their representatives.",
+    "Emission factors are sourced from recognised databases and reviewed by the sustainability controlling function.",
+    "Total waste generated was {n} tonnes, of which {p}% was diverted from disposal through recycling or reuse.",
+    "No confirmed incidents of corruption or bribery were recorded during the reporting period.",
+]
+
+BULLETS = [
+    "Reduce absolute Scope 1 and 2 emissions by {p}% by 2030 against the 2019 base year.",
+    "Source {p}% of electricity from renewable contracts by 2027.",
+    "Achieve zero fatalities and reduce the recordable accident rate below {r}.",
+    "Engage suppliers representing {p}% of procurement spend on science-based targets.",
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        n=f"{rng.randint(100, 999_999):,}",
+        m=f"{rng.randint(100, 999_999):,}",
+        p=rng.randint(5, 95),
+        r=f"{rng.uniform(0.1, 9.9):.1f}",
+    )
+
+
+def report_sections(size_bytes: int, seed: int = 42):
+    """Yield (heading, paragraphs, bullets, table rows) until roughly size_bytes of text"""
+    rng = random.Random(seed)
+    total = 0
+    while total < size_bytes:
+        standard, code, title = rng.choice(DISCLOSURES)
+        heading = f"{standard} {code} {title}"
+        paragraphs = [
+            " ".join(_fill(rng.choice(SENTENCES), rng) for _ in range(rng.randint(3, 7)))
+            for _ in range(rng.randint(2, 4))
+        ]
+        bullets = [_fill(rng.choice(BULLETS), rng) for _ in range(rng.randint(0, 3))]
+        rows = [
+            [metric, f"{rng.randint(100, 99_999):,}", f"{rng.randint(100, 99_999):,}", f"{rng.randint(-30, 30)}%"]
+            for metric in ("Scope 1", "Scope 2", "Scope 3")
+        ] if code == "E1-6" else []
+        total += len(heading) + sum(map(len, paragraphs)) + sum(map(len, bullets)) + 30 * len(rows)
+        yield heading, paragraphs, bullets, rows
+
+
+def report_text(size_bytes: int, seed: int = 42, wrap: int = 0) -> str:
+    """Plain text report; with wrap > 0 lines are wrapped like PyPDF2 output, without blank lines"""
+    lines: List[str] = []
+    for heading, paragraphs, bullets, rows in report_sections(size_bytes, seed):
+        lines.append(heading)
+        for paragraph in paragraphs:
+            lines.extend(textwrap.wrap(paragraph, wrap) if wrap else [paragraph, ""])
+        lines.extend(f"• {bullet}" for bullet in bullets)
+        lines.extend(" ".join(row) for row in rows)
+        if not wrap:
+            lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _pdf_escape(text: str) -> str:
+    text = text.replace("•", "-")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def report_pdf(size_bytes: int, seed: int = 42) -> bytes:
+    """Minimal multi-page PDF with one Helvetica text line per wrapped line"""
+    lines = report_text(size_bytes, seed, wrap=95).splitlines()
+    lines_per_page = 60
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    for page_lines in pages:
+        stream = "BT /F1 9 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in page_lines) + " ET"
+        data = stream.encode("latin-1", "replace")
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects.append((content_id, b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"))
+        objects.append((page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()))
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects = [
+        (1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()),
+        (font_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"),
+    ] + objects
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id, body in objects:
+        offsets[object_id] = out.tell()
+        out.write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for object_id in sorted(offsets):
+        out.write(b"%010d 00000 n \n" % offsets[object_id])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def report_docx(size_bytes: int, seed: int = 42) -> bytes:
+    import docx
+
+    document = docx.Document()
+    for heading, paragraphs, bullets, rows in report_sections(size_bytes, seed):
+        document.add_heading(heading, level=2)
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+        for bullet in bullets:
+            document.add_paragraph(bullet, style="List Bullet")
+        for row in rows:
+            document.add_paragraph("\t".join(row))
+
+    out = BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def write_corpus(directory: str, sizes_kb: List[int], seed: int = 42) -> List[str]:
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size_kb in sizes_kb:
+        size = size_kb * 1024
+        for extension, payload in (
+            ("txt", report_text(size, seed).encode("utf-8")),
+            ("pdf", report_pdf(size, seed)),
+            ("docx", report_docx(size, seed)),
+        ):
+            path = os.path.join(directory, f"esrs-{size_kb}k.{extension}")
+            with open(path, "wb") as f:
+                f.write(payload)
+            paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--sizes", default="64,512", help="comma-separated text sizes in KB")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    for path in write_corpus(args.out, [int(s) for s in args.sizes.split(",")], args.seed):
+        print(f"{os.path.getsize(path):>10}  {path}")
@@ -0,0 +1,259 @@
+# File: benchmarks/run_benchmarks.py
+"""End-to-end API benchmarks against an in-process app and a throwaway database.
+
+Run from the backend directory:
+
+    python -m benchmarks.run_benchmarks --concurrency 1,4,16 --requests 64 --output results.json
+    python -m benchmarks.run_benchmarks --compare before.json after.json
+
+Each operation (login, upload, upload_text, list, export, get, delete) is driven through
+httpx's ASGI transport at every concurrency level, and throughput plus
+p50/p95/p99 latency are written as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import count
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPERATIONS = ["login", "upload", "upload_text", "list", "export", "get", "delete"]
+PASSWORD = "benchmark-password"
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+class Workload:
+    """Per-user state shared by the operations: tokens and report ids to read or delete"""
+
+    def __init__(self, client, corpus, users: int):
+        self.client = client
+        self.corpus = corpus
+        self.users = users
+        self.headers = []
+        self.report_ids = []
+        self.deletable = []
+        self._upload_counter = count()
+
+    async def setup(self, seed_reports: int):
+        for i in range(self.users):
+            email = f"bench{i}@example.com"
+            await self.client.post("/register", json={"email": email, "username": f"bench{i}", "password": PASSWORD})
+            response = await self.client.post("/login", json={"email": email, "password": PASSWORD})
+            response.raise_for_status()
+            self.headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+        # Libraries to list and get, one per user
+        for i in range(seed_reports):
+            response = await self.client.post(
+                "/api/files/upload-text",
+                json={"text": self.corpus["txt"], "title": f"seed {i}"},
+                headers=self.headers[i % self.users],
+            )
+            response.raise_for_status()
+            self.report_ids.append((i % self.users, response.json()["id"]))
+
+    async def login(self, i: int):
+        user = i % self.users
+        return await self.client.post("/login", json={"email": f"bench{user}@example.com", "password": PASSWORD})
+
+    async def upload(self, i: int):
+        extension = ("pdf", "docx")[next(self._upload_counter) % 2]
+        mime = {
+            "pdf": "application/pdf",
+            "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        }[extension]
+        user = i % self.users
+        response = await self.client.post(
+            "/api/files/upload",
+            files={"file": (f"report-{i}.{extension}", self.corpus[extension], mime)},
+            headers=self.headers[user],
+        )
+        if response.status_code == 200:
+            self.deletable.append((user, response.json()["id"]))
+        return response
+
+    async def upload_text(self, i: int):
+        return await self.client.post(
+            "/api/files/upload-text",
+            json={"text": self.corpus["txt"], "title": f"text {i}"},
+            headers=self.headers[i % self.users],
+        )
+
+    async def list(self, i: int):
+        return await self.client.get("/api/files/reports", headers=self.headers[i % self.users])
+
+    async def export(self, i: int):
+        return await self.client.get("/api/files/export", headers=self.headers[i % self.users])
+
+    async def get(self, i: int):
+        user, report_id = self.report_ids[i % len(self.report_ids)]
+        return await self.client.get(f"/api/files/reports/{report_id}", headers=self.headers[user])
+
+    async def delete(self, i: int):
+        if not self.deletable:
+            raise RuntimeError("run upload before delete")
+        user, report_id = self.deletable.pop()
+        return await self.client.delete(f"/api/files/reports/{report_id}", headers=self.headers[user])
+
+
+async def run_operation(workload: Workload, operation: str, concurrency: int, requests: int) -> dict:
+    handler = getattr(workload, operation)
+    latencies = []
+    errors = 0
+    issued = count()
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(issued)
+            if i >= requests:
+                return
+            start = time.perf_counter()
+            try:
+                response = await handler(i)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "operation": operation,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": requests / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def run(args) -> dict:
+    # The app uses relative paths for auth.db and uploads/, so it is imported from a scratch directory
+    workdir = tempfile.mkdtemp(prefix="esrs-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    if not args.quotas:
+        # Per-user upload quotas would turn most of the load into 429s
+        os.environ.update(USER_MAX_CONCURRENT_UPLOADS="1000", USER_UPLOAD_RATE="1e6", USER_UPLOAD_BURST="1000000",
+                          USER_BYTES_RATE="1e12")
+
+    import httpx
+    from main import app
+    from benchmarks.corpus import report_text, report_pdf, report_docx
+
+    size = args.report_kb * 1024
+    corpus = {
+        "txt": report_text(size, args.seed),
+        "pdf": report_pdf(size, args.seed),
+        "docx": report_docx(size, args.seed),
+    }
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            workload = Workload(client, corpus, args.users)
+            await workload.setup(args.seed_reports)
+
+            for concurrency in args.concurrency:
+                for operation in args.operations:
+                    result = await run_operation(workload, operation, concurrency, args.requests)
+                    results.append(result)
+                    print(
+                        f"{operation:<12} c={concurrency:<3} {result['throughput_rps']:8.1f} req/s  "
+                        f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                        f"p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}",
+                        flush=True,
+                    )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workdir": workdir,
+            "args": {key: value for key, value in vars(args).items() if key != "compare"},
+            "corpus_bytes": {kind: len(payload) for kind, payload in corpus.items()},
+        },
+        "results": results,
+    }
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = {(r["operation"], r["concurrency"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+
+    print(f"{'operation':<12} {'c':>3} {'req/s':>18} {'p95 ms':>22}")
+    for result in after:
+        old = before.get((result["operation"], result["concurrency"]))
+        if not old:
+            continue
+        rps_change = 100 * (result["throughput_rps"] / old["throughput_rps"] - 1)
+        p95_change = 100 * (result["p95_ms"] / old["p95_ms"] - 1)
+        print(
+            f"{result['operation']:<12} {result['concurrency']:>3} "
+            f"{result['throughput_rps']:9.1f} ({rps_change:+5.0f}%) "
+            f"{result['p95_ms']:11.1f} ({p95_change:+5.0f}%)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="requests per operation and level")
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--seed-reports", type=int, default=8, help="reports created up front for list/get")
+    parser.add_argument("--report-kb", type=int, default=64, help="size of generated report text")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--quotas", action="store_true", help="keep the default per-user upload quotas")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    args.operations = [operation for operation in args.operations.split(",") if operation]
+    args.output = os.path.abspath(args.output)
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
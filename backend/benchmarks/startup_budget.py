@@ -0,0 +1,97 @@
+# File: benchmarks/startup_budget.py
+"""Startup budget check: import time and time to first request.
+
+Each run starts a fresh interpreter in a scratch directory, imports main, runs
+the lifespan and serves GET / through the ASGI app. Fails (exit code 1) when
+the median exceeds a budget, when importing main touches the filesystem, or
+when a lazily loaded module shows up before it is needed.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup_budget --runs 5 --import-budget-ms 800 --first-request-budget-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only loaded on first use: PDF/DOCX parsing and password hashing
+LAZY_MODULES = ["PyPDF2", "docx", "passlib.context", "numpy"]
+
+PROBE = """
+import asyncio, json, os, sys, time
+start = time.perf_counter()
+from main import app
+import_ms = (time.perf_counter() - start) * 1000
+created_on_import = sorted(os.listdir("."))
+loaded = [name for name in LAZY_MODULES if name in sys.modules]
+
+async def first_request():
+    import httpx
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/")
+            response.raise_for_status()
+
+asyncio.run(first_request())
+first_request_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({
+    "import_ms": import_ms,
+    "first_request_ms": first_request_ms,
+    "created_on_import": created_on_import,
+    "lazy_modules_loaded": loaded,
+}))
+"""
+
+
+def probe() -> dict:
+    workdir = tempfile.mkdtemp(prefix="esrs-startup-")
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, PYTHONDONTWRITEBYTECODE="1")
+    output = subprocess.check_output(
+        [sys.executable, "-c", f"LAZY_MODULES = {LAZY_MODULES!r}\n{PROBE}"],
+        cwd=workdir,
+        env=env,
+        text=True,
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs: int, import_budget_ms: float, first_request_budget_ms: float) -> bool:
+    # Warm the OS file cache and bytecode so every measured run starts from the same state
+    subprocess.check_call([sys.executable, "-m", "compileall", "-q", BACKEND_DIR])
+    probe()
+
+    results = [probe() for _ in range(runs)]
+    import_ms = statistics.median(r["import_ms"] for r in results)
+    first_request_ms = statistics.median(r["first_request_ms"] for r in results)
+
+    failures = []
+    if import_ms > import_budget_ms:
+        failures.append(f"import main took {import_ms:.0f} ms, budget {import_budget_ms:.0f} ms")
+    if first_request_ms > first_request_budget_ms:
+        failures.append(f"first request after {first_request_ms:.0f} ms, budget {first_request_budget_ms:.0f} ms")
+    if results[0]["created_on_import"]:
+        failures.append(f"importing main created {results[0]['created_on_import']}, move it into the lifespan")
+    if results[0]["lazy_modules_loaded"]:
+        failures.append(f"imported at startup but meant to be lazy: {results[0]['lazy_modules_loaded']}")
+
+    print(f"import main:       {import_ms:7.1f} ms (budget {import_budget_ms:.0f} ms)")
+    print(f"first request:     {first_request_ms:7.1f} ms (budget {first_request_budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=800)
+    parser.add_argument("--first-request-budget-ms", type=float, default=1000)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.runs, args.import_budget_ms, args.first_request_budget_ms) else 1)
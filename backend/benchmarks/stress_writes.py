@@ -0,0 +1,175 @@
+# File: benchmarks/stress_writes.py
+"""Write stress test for SQLite under several worker processes.
+
+Each process plays one uvicorn worker and runs a few threads that mix
+create_report, store_refresh_token and delete_report against a scratch
+database for a fixed time. Exits with status 1 if any write failed with
+"database is locked".
+
+Run from the backend directory:
+
+    python -m benchmarks.stress_writes --workers 8 --threads 4 --seconds 10
+    python -m benchmarks.stress_writes --mode direct   # connection-per-call commits, as before the writer queue
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERS = 8
+
+
+def _report(rng: random.Random, text: str):
+    from model import ReportBlock, ReportDocument
+
+    blocks = [
+        ReportBlock(id=str(uuid.uuid4()), content=paragraph, type="paragraph", tags=[])
+        for paragraph in rng.sample(text, rng.randint(5, min(60, len(text))))
+    ]
+    now = datetime.now().isoformat()
+    return ReportDocument(id=str(uuid.uuid4()), title="stress", created_at=now, updated_at=now, blocks=blocks)
+
+
+def _direct(func, *args):
+    """Pre-queue behaviour: a fresh connection and a commit per call"""
+    from core.config import DATABASE_URL
+
+    conn = sqlite3.connect(DATABASE_URL)
+    try:
+        result = func(conn.cursor(), *args)
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+def _operations(mode: str):
+    import auth
+    import database
+    from core.minhash import compute_signature
+
+    if mode == "queue":
+        return {
+            "create_report": lambda report, user_id: database.create_report(report, user_id, None),
+            "delete_report": lambda report_id, user_id: database.delete_report(report_id, user_id, None),
+            "store_refresh_token": auth.store_refresh_token,
+        }
+    return {
+        "create_report": lambda report, user_id: _direct(
+            database._create_report, report, user_id, [compute_signature(b.content) for b in report.blocks]
+        ),
+        "delete_report": lambda report_id, user_id: _direct(database._delete_report, report_id, user_id),
+        "store_refresh_token": lambda *args: _direct(auth._store_refresh_token, *args),
+    }
+
+
+def worker(worker_id: int, mode: str, threads: int, seconds: float) -> dict:
+    from benchmarks.corpus import report_text
+
+    operations = _operations(mode)
+    paragraphs = [p for p in report_text(64 * 1024, seed=worker_id).split("\n\n") if p.strip()]
+    totals = {"ops": 0, "created": 0, "deleted": 0, "lock_errors": 0, "other_errors": 0, "latencies": []}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def run(thread_id: int):
+        rng = random.Random(worker_id * 1000 + thread_id)
+        mine = []
+        counts = {"ops": 0, "created": 0, "deleted": 0, "lock_errors": 0, "other_errors": 0}
+        latencies = []
+        while time.monotonic() < deadline:
+            user_id = rng.randint(1, USERS)
+            choice = rng.random()
+            start = time.perf_counter()
+            try:
+                if choice < 0.4:
+                    report = _report(rng, paragraphs)
+                    operations["create_report"](report, user_id)
+                    mine.append((report.id, user_id))
+                    counts["created"] += 1
+                elif choice < 0.6 and mine:
+                    operations["delete_report"](*mine.pop(rng.randrange(len(mine))))
+                    counts["deleted"] += 1
+                else:
+                    operations["store_refresh_token"](user_id, uuid.uuid4().hex, datetime.utcnow() + timedelta(days=7))
+            except sqlite3.OperationalError as e:
+                counts["lock_errors" if "locked" in str(e) or "busy" in str(e) else "other_errors"] += 1
+            except Exception:
+                counts["other_errors"] += 1
+            latencies.append(time.perf_counter() - start)
+            counts["ops"] += 1
+        with lock:
+            for key, value in counts.items():
+                totals[key] += value
+            totals["latencies"].extend(latencies)
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    if mode == "queue":
+        from core.write_queue import stop_write_queue
+        stop_write_queue()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8, help="processes, like uvicorn --workers")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent requests per worker")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--mode", choices=["queue", "direct"], default="queue")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="esrs-stress-"))
+    sys.path.insert(0, BACKEND_DIR)
+    import database
+    from core.config import DATABASE_URL
+
+    if args.mode == "queue":
+        database.init_db()
+    else:
+        database.init_users_db()
+        database.init_reports_db()
+
+    conn = sqlite3.connect(DATABASE_URL)
+    conn.executemany(
+        "INSERT INTO users (email, username, hashed_password) VALUES (?, ?, ?)",
+        [(f"stress{i}@example.com", f"stress{i}", "-") for i in range(USERS)],
+    )
+    conn.commit()
+
+    # Forked workers inherit the working directory and sys.path set above
+    with ProcessPoolExecutor(args.workers, mp_context=get_context("fork")) as pool:
+        futures = [pool.submit(worker, i, args.mode, args.threads, args.seconds) for i in range(args.workers)]
+        results = [future.result() for future in futures]
+
+    totals = {key: sum(r[key] for r in results) for key in ("ops", "created", "deleted", "lock_errors", "other_errors")}
+    latencies = sorted(latency for r in results for latency in r["latencies"])
+    reports = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+    conn.close()
+
+    print(f"mode {args.mode}, {args.workers} worker(s) x {args.threads} thread(s), {args.seconds:.0f} s")
+    print(f"writes:        {totals['ops']} ({totals['ops'] / args.seconds:.0f}/s)")
+    print(f"p50 / p99:     {latencies[len(latencies) // 2] * 1000:.1f} / {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"lock errors:   {totals['lock_errors']}")
+    print(f"other errors:  {totals['other_errors']}")
+    print(f"reports left:  {reports} (expected {totals['created'] - totals['deleted']})")
+
+    consistent = reports == totals["created"] - totals["deleted"]
+    sys.exit(0 if totals["lock_errors"] == 0 and totals["other_errors"] == 0 and consistent else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# File: core/admission.py
+"""Admission control for ingestion requests.
+
+Two stages of checks run before a request may start extracting:
+
+    per user    at most USER_MAX_CONCURRENT_UPLOADS in flight, plus token buckets
+                on requests and bytes, exceeding any of them is a 429
+    global      MAX_CONCURRENT_EXTRACTIONS slots, up to EXTRACTION_QUEUE_SIZE
+                requests wait for one, a full queue or a wait longer than
+                EXTRACTION_QUEUE_TIMEOUT is a 503
+
+The per-user stage runs in IngestAdmissionMiddleware, before FastAPI reads the
+body, so a rejected upload is answered without receiving it. The bytes bucket
+is charged with the body as it is actually received, a declared Content-Length
+only allows rejecting up front. The global stage runs in the route dependency
+once the body is in, so slow uploads do not hold extraction slots.
+
+Every rejection carries a Retry-After header. State lives in the worker
+process and is only touched from the event loop, so no locking is needed.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+from core.config import (
+    MAX_CONCURRENT_EXTRACTIONS,
+    EXTRACTION_QUEUE_SIZE,
+    EXTRACTION_QUEUE_TIMEOUT,
+    USER_MAX_CONCURRENT_UPLOADS,
+    USER_UPLOAD_RATE,
+    USER_UPLOAD_BURST,
+    USER_BYTES_RATE,
+    USER_BYTES_BURST,
+)
+from core.metrics import ADMISSION_ACTIVE, ADMISSION_WAITING, ADMISSION_WAIT_SECONDS, ADMISSION_REJECTIONS
+
+# Idle users whose buckets have refilled are forgotten once this many are tracked
+MAX_TRACKED_USERS = 10000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available, 0 if they are now"""
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+    def is_full(self) -> bool:
+        return self.tokens >= self.capacity
+
+
+class UserQuota:
+    def __init__(self):
+        self.requests = TokenBucket(USER_UPLOAD_RATE, USER_UPLOAD_BURST)
+        self.bytes = TokenBucket(USER_BYTES_RATE, USER_BYTES_BURST)
+        self.active = 0
+
+
+class IngestTicket:
+    """One admitted request, what it was charged so a 503 can refund it"""
+
+    def __init__(self, quota: UserQuota):
+        self.quota = quota
+        self.charged = 0
+
+
+def _reject(status_code: int, reason: str, detail: str, retry_after: float):
+    ADMISSION_REJECTIONS.labels(reason).inc()
+    raise HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionController:
+    def __init__(self, slots: int = MAX_CONCURRENT_EXTRACTIONS, queue_size: int = EXTRACTION_QUEUE_SIZE,
+                 queue_timeout: float = EXTRACTION_QUEUE_TIMEOUT):
+        self.slots = slots
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(slots)
+        self._waiting = 0
+        self._users: Dict[int, UserQuota] = {}
+        # Moving average of how long a slot is held, used to estimate Retry-After on 503
+        self._hold_seconds = 1.0
+
+    def _quota(self, user_id: int, now: float) -> UserQuota:
+        quota = self._users.get(user_id)
+        if quota is None:
+            if len(self._users) >= MAX_TRACKED_USERS:
+                self._forget_idle_users(now)
+            quota = self._users[user_id] = UserQuota()
+        quota.requests.refill(now)
+        quota.bytes.refill(now)
+        return quota
+
+    def _forget_idle_users(self, now: float):
+        for user_id, quota in list(self._users.items()):
+            quota.requests.refill(now)
+            quota.bytes.refill(now)
+            if not quota.active and quota.requests.is_full() and quota.bytes.is_full():
+                del self._users[user_id]
+
+    def _check_user(self, user_id: int, declared_size: int) -> UserQuota:
+        quota = self._quota(user_id, time.monotonic())
+
+        if quota.active >= USER_MAX_CONCURRENT_UPLOADS:
+            _reject(status.HTTP_429_TOO_MANY_REQUESTS, "user_concurrency",
+                    "Too many uploads in progress for this account", self._hold_seconds)
+
+        request_wait = quota.requests.wait_time(1)
+        if request_wait:
+            _reject(status.HTTP_429_TOO_MANY_REQUESTS, "user_requests",
+                    "Upload rate limit exceeded", request_wait)
+
+        # Bytes are charged as they arrive, a declared length only rejects early
+        bytes_wait = quota.bytes.wait_time(declared_size)
+        if bytes_wait:
+            _reject(status.HTTP_429_TOO_MANY_REQUESTS, "user_bytes",
+                    "Upload volume limit exceeded", bytes_wait)
+
+        quota.requests.take(1)
+        return quota
+
+    def charge(self, ticket: IngestTicket, size: int):
+        """Take received body bytes from the user's bucket, or raise 429"""
+        bucket = ticket.quota.bytes
+        bucket.refill(time.monotonic())
+        # Unlike a whole request, received bytes are never capped to the bucket size
+        if size > bucket.tokens:
+            _reject(status.HTTP_429_TOO_MANY_REQUESTS, "user_bytes",
+                    "Upload volume limit exceeded", (size - bucket.tokens) / bucket.rate)
+        bucket.tokens -= size
+        ticket.charged += size
+
+    def _check_queue(self):
+        if self._semaphore.locked() and self._waiting >= self.queue_size:
+            _reject(status.HTTP_503_SERVICE_UNAVAILABLE, "queue_full",
+                    "Server is busy processing uploads, please retry",
+                    self._hold_seconds * (self._waiting + 1) / self.slots)
+
+    async def _acquire_slot(self):
+        self._check_queue()
+
+        self._waiting += 1
+        ADMISSION_WAITING.inc()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            _reject(status.HTTP_503_SERVICE_UNAVAILABLE, "queue_timeout",
+                    "Server is busy processing uploads, please retry",
+                    self._hold_seconds * self._waiting / self.slots)
+        finally:
+            self._waiting -= 1
+            ADMISSION_WAITING.dec()
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start)
+
+    @asynccontextmanager
+    async def admit_user(self, user_id: int, declared_size: int = 0):
+        """Count a request against the user's quota for the body of the block, or raise 429/503"""
+        quota = self._check_user(user_id, declared_size)
+        ticket = IngestTicket(quota)
+        try:
+            # A full queue is already known, there is no point receiving the body
+            self._check_queue()
+        except HTTPException:
+            self._refund(ticket)
+            raise
+        quota.active += 1
+        try:
+            yield ticket
+        finally:
+            quota.active -= 1
+
+    @asynccontextmanager
+    async def extraction_slot(self, ticket: Optional[IngestTicket] = None):
+        """Hold an extraction slot for the body of the block, or raise 503"""
+        try:
+            await self._acquire_slot()
+        except HTTPException:
+            if ticket is not None:
+                self._refund(ticket)
+            raise
+        ADMISSION_ACTIVE.inc()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.monotonic() - start)
+            ADMISSION_ACTIVE.dec()
+            self._semaphore.release()
+
+    def _refund(self, ticket: IngestTicket):
+        # Server-side saturation is not charged to the user's quota
+        ticket.quota.requests.give(1)
+        ticket.quota.bytes.give(ticket.charged)
+        ticket.charged = 0
+
+
+ingest_admission = AdmissionController()
+
+
+class IngestAdmissionMiddleware:
+    """Pure ASGI middleware applying the per-user limits to ingest requests before their body is read.
+
+    The ticket is left in the request state for the route's extraction_slot.
+    Requests that do not authenticate pass through and are refused by the route.
+    """
+
+    def __init__(self, app, paths: Iterable[str]):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        from auth import get_scope_user
+
+        user = await get_scope_user(scope)
+        if user is None:
+            await self.app(scope, receive, send)
+            return
+        user_id = user["id"]
+
+        try:
+            declared_size = int(dict(scope["headers"]).get(b"content-length", b"0"))
+        except ValueError:
+            declared_size = 0
+
+        try:
+            async with ingest_admission.admit_user(user_id, declared_size) as ticket:
+                scope.setdefault("state", {})["ingest_ticket"] = ticket
+
+                async def charged_receive():
+                    message = await receive()
+                    if message["type"] == "http.request":
+                        # Raised inside the app, FastAPI answers it like any HTTPException
+                        ingest_admission.charge(ticket, len(message.get("body", b"")))
+                    return message
+
+                await self.app(scope, charged_receive, send)
+        except HTTPException as e:
+            # Only admit_user gets here, the app answers its own HTTPExceptions
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            await response(scope, receive, send)
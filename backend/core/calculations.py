@@ -0,0 +1,160 @@
+# File: core/calculations.py
+"""XBRL calculation checks over the numeric facts tagged in report blocks.
+
+A calculation network is a list of arcs shaped like CalculationArc in
+types/taxonomy.ts, {"from": total, "to": item, "weight": w}, and every reported
+total should equal the weighted sum of its items. The checks follow XBRL
+Calculations 1.1 round-to-nearest: items that are not reported count as zero,
+a summation is only checked when its total and at least one item are reported,
+and values are compared as intervals as wide as the precision each number was
+written with. Summations touching a concept reported twice with different
+values are skipped and the duplicate is reported instead.
+
+The network compiles to a sparse weight matrix in COO form over a concept
+index, so all summations of a report are computed by one weighted bincount
+over the arcs rather than a loop per fact. Facts come from core.facts.
+"""
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.facts import concept_key
+
+# ESRS E1 summations checked when the request brings no network of its own
+DEFAULT_CALCULATIONS = [
+    ("esrs:TotalGHGEmissionsLocationBased", "esrs:GrossScope1GreenhouseGasEmissions", 1.0),
+    ("esrs:TotalGHGEmissionsLocationBased", "esrs:GrossLocationBasedScope2GreenhouseGasEmissions", 1.0),
+    ("esrs:TotalGHGEmissionsLocationBased", "esrs:GrossScope3GreenhouseGasEmissions", 1.0),
+    ("esrs:TotalGHGEmissionsMarketBased", "esrs:GrossScope1GreenhouseGasEmissions", 1.0),
+    ("esrs:TotalGHGEmissionsMarketBased", "esrs:GrossMarketBasedScope2GreenhouseGasEmissions", 1.0),
+    ("esrs:TotalGHGEmissionsMarketBased", "esrs:GrossScope3GreenhouseGasEmissions", 1.0),
+    ("esrs:TotalEnergyConsumptionRelatedToOwnOperations", "esrs:EnergyConsumptionFromFossilSources", 1.0),
+    ("esrs:TotalEnergyConsumptionRelatedToOwnOperations", "esrs:EnergyConsumptionFromNuclearSources", 1.0),
+    ("esrs:TotalEnergyConsumptionRelatedToOwnOperations", "esrs:EnergyConsumptionFromRenewableSources", 1.0),
+]
+
+class CalculationNetwork:
+    """Calculation arcs compiled to a sparse matrix in COO form.
+
+    Row and column indexes are both positions in `concepts`, arcs are sorted
+    by total so the items of one summation are a contiguous slice.
+    """
+
+    def __init__(self, arcs: Sequence[Tuple[str, str, float]]):
+        # A repeated arc overrides the earlier one
+        weights = {(concept_key(total), concept_key(item)): float(weight) for total, item, weight in arcs}
+        ordered = sorted(weights.items())
+
+        self.concepts = {}
+        for (total, item), _ in ordered:
+            self.concepts.setdefault(total, len(self.concepts))
+            self.concepts.setdefault(item, len(self.concepts))
+        self.names = list(self.concepts)
+
+        self.totals = np.fromiter((self.concepts[total] for (total, _), _ in ordered), dtype=np.intp, count=len(ordered))
+        self.items = np.fromiter((self.concepts[item] for (_, item), _ in ordered), dtype=np.intp, count=len(ordered))
+        self.weights = np.fromiter((weight for _, weight in ordered), dtype=np.float64, count=len(ordered))
+        arc_counts = np.bincount(self.totals, minlength=len(self.names))
+        self.is_total = arc_counts > 0
+        # Arcs of a total are contiguous, [arc_start, arc_start + arc_count) for each row
+        self.arc_start = np.zeros(len(self.names), dtype=np.intp)
+        totals, first = np.unique(self.totals, return_index=True)
+        self.arc_start[totals] = first
+        self.arc_end = self.arc_start + arc_counts
+
+    def _sum(self, values: np.ndarray) -> np.ndarray:
+        """Weighted sum of item values per total, the sparse matrix times `values`"""
+        return np.bincount(self.totals, weights=self.weights * values[self.items], minlength=len(self.names))
+
+    def check(self, facts: Iterable[Tuple[str, float, float]]) -> dict:
+        """Check every summation against facts given as (concept, value, half unit)"""
+        size = len(self.names)
+        indexes, values, half_units = [], [], []
+        for concept, value, half_unit in facts:
+            index = self.concepts.get(concept_key(concept))
+            if index is not None:
+                indexes.append(index)
+                values.append(value)
+                half_units.append(half_unit)
+
+        indexes = np.array(indexes, dtype=np.intp)
+        fact_values = np.array(values, dtype=np.float64)
+        fact_half_units = np.array(half_units, dtype=np.float64)
+
+        # Group facts per concept, the first reported one is used
+        order = np.argsort(indexes, kind="stable")
+        grouped, starts = np.unique(indexes[order], return_index=True)
+        value = np.zeros(size)
+        half_unit = np.zeros(size)
+        reported = np.zeros(size, dtype=bool)
+        duplicate = np.zeros(size, dtype=bool)
+        sorted_values = fact_values[order]
+        if len(grouped):
+            sorted_half_units = fact_half_units[order]
+            value[grouped] = sorted_values[starts]
+            half_unit[grouped] = sorted_half_units[starts]
+            reported[grouped] = True
+            # Duplicates are consistent when their rounding intervals overlap
+            spread = np.maximum.reduceat(sorted_values, starts) - np.minimum.reduceat(sorted_values, starts)
+            duplicate[grouped] = spread > 2 * np.maximum.reduceat(sorted_half_units, starts)
+
+        usable = reported & ~duplicate
+        computed = self._sum(np.where(usable, value, 0.0))
+        tolerance = half_unit + np.bincount(
+            self.totals, weights=np.abs(self.weights) * np.where(usable, half_unit, 0.0)[self.items], minlength=size
+        )
+        items_reported = np.bincount(self.totals, weights=usable[self.items], minlength=size) > 0
+        items_duplicated = np.bincount(self.totals, weights=duplicate[self.items], minlength=size) > 0
+
+        checked = self.is_total & usable & items_reported & ~items_duplicated
+        inconsistent = checked & (np.abs(value - computed) > tolerance)
+
+        return {
+            "facts": len(indexes),
+            "summations": int(self.is_total.sum()),
+            "checked": int(checked.sum()),
+            "inconsistencies": [
+                self._inconsistency(int(index), value, computed, tolerance, usable)
+                for index in np.flatnonzero(inconsistent)
+            ],
+            "duplicates": self._duplicates(grouped, starts, sorted_values, duplicate),
+        }
+
+    def _duplicates(self, grouped, starts, sorted_values, duplicate) -> list:
+        """Values of each duplicated concept, sliced from the facts already grouped by concept"""
+        ends = np.append(starts[1:], len(sorted_values))
+        return [
+            {"concept": self.names[grouped[group]], "values": sorted_values[starts[group]:ends[group]].tolist()}
+            for group in np.flatnonzero(duplicate[grouped])
+        ]
+
+    def _inconsistency(self, index: int, value, computed, tolerance, usable) -> dict:
+        arcs = range(self.arc_start[index], self.arc_end[index])
+        return {
+            "concept": self.names[index],
+            "reported": float(value[index]),
+            "computed": float(computed[index]),
+            "difference": float(value[index] - computed[index]),
+            "tolerance": float(tolerance[index]),
+            "items": [
+                {
+                    "concept": self.names[self.items[arc]],
+                    "weight": float(self.weights[arc]),
+                    "value": float(value[self.items[arc]]) if usable[self.items[arc]] else None,
+                }
+                for arc in arcs
+            ],
+        }
+
+
+@lru_cache(maxsize=32)
+def compile_network(arcs: Tuple[Tuple[str, str, float], ...]) -> CalculationNetwork:
+    return CalculationNetwork(arcs)
+
+
+def validate_calculations(facts: Iterable[Tuple[str, float, float]],
+                          arcs: Optional[Sequence[Tuple[str, str, float]]] = None) -> dict:
+    """Check the summations of a network, DEFAULT_CALCULATIONS when arcs is None, against (concept, value, half unit) facts"""
+    network = compile_network(tuple(DEFAULT_CALCULATIONS if arcs is None else arcs))
+    return network.check(facts)
@@ -0,0 +1,234 @@
+# File: core/compression.py
+"""zstd compression for report block content, enabled with BLOCK_COMPRESSION=zstd.
+
+zstandard is a hard dependency, rows written compressed cannot be read back
+without it. Each row carries a codec marker next to its content:
+
+    raw            plain text
+    zstd           zstd frame without dictionary
+    zstd:<id>      zstd frame compressed with dictionary <id> from compression_dictionaries
+
+Usage from the backend directory:
+
+    python -m core.compression train     # train a dictionary on the stored corpus
+    python -m core.compression migrate   # re-encode existing rows and versions with BLOCK_COMPRESSION
+    python -m core.compression stats
+"""
+import sys
+import threading
+import time
+from typing import Optional, Tuple
+
+import zstandard
+
+from core.config import (
+    DATABASE_URL,
+    BLOCK_COMPRESSION,
+    COMPRESSION_LEVEL,
+    COMPRESSION_MIN_BYTES,
+    COMPRESSION_DICTIONARY_SIZE,
+    COMPRESSION_DICTIONARY_RECHECK_SECONDS,
+)
+
+RAW_CODEC = "raw"
+ZSTD_CODEC = "zstd"
+# Tables storing block content next to a codec marker
+CONTENT_TABLES = ("report_blocks", "report_version_blocks")
+
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+_active_dictionary_id = None
+# Monotonic time after which the active dictionary is looked up again
+_active_dictionary_expires = 0.0
+_local = threading.local()
+
+
+def compression_enabled() -> bool:
+    return BLOCK_COMPRESSION == ZSTD_CODEC
+
+
+def init_compression_db(cursor):
+    """Create the dictionary table and the per-row codec column"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS compression_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dictionary BLOB NOT NULL,
+            sample_count INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("PRAGMA table_info(report_blocks)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if "content_codec" not in columns:
+        cursor.execute(f"ALTER TABLE report_blocks ADD COLUMN content_codec TEXT DEFAULT '{RAW_CODEC}'")
+
+
+def _load_dictionary(dictionary_id: int, cursor):
+    with _dictionaries_lock:
+        dictionary = _dictionaries.get(dictionary_id)
+        if dictionary is None:
+            cursor.execute("SELECT dictionary FROM compression_dictionaries WHERE id = ?", (dictionary_id,))
+            row = cursor.fetchone()
+            if not row:
+                raise ValueError(f"Unknown compression dictionary {dictionary_id}")
+            dictionary = zstandard.ZstdCompressionDict(row[0])
+            dictionary.precompute_compress(level=COMPRESSION_LEVEL)
+            _dictionaries[dictionary_id] = dictionary
+        return dictionary
+
+
+def _active_dictionary(cursor) -> Optional[int]:
+    """Newest dictionary id, re-read periodically so one trained by another process is picked up"""
+    global _active_dictionary_id, _active_dictionary_expires
+    now = time.monotonic()
+    if now >= _active_dictionary_expires:
+        cursor.execute("SELECT MAX(id) FROM compression_dictionaries")
+        _active_dictionary_id = cursor.fetchone()[0]
+        _active_dictionary_expires = now + COMPRESSION_DICTIONARY_RECHECK_SECONDS
+    return _active_dictionary_id
+
+
+def _compressor(dictionary_id: Optional[int], cursor):
+    # zstd contexts are not thread-safe, keep one per thread and dictionary
+    compressors = getattr(_local, "compressors", None)
+    if compressors is None:
+        compressors = _local.compressors = {}
+    if dictionary_id not in compressors:
+        dictionary = _load_dictionary(dictionary_id, cursor) if dictionary_id else None
+        compressors[dictionary_id] = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dictionary)
+    return compressors[dictionary_id]
+
+
+def _decompressor(dictionary_id: Optional[int], cursor):
+    decompressors = getattr(_local, "decompressors", None)
+    if decompressors is None:
+        decompressors = _local.decompressors = {}
+    if dictionary_id not in decompressors:
+        dictionary = _load_dictionary(dictionary_id, cursor) if dictionary_id else None
+        decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressors[dictionary_id]
+
+
+def encode_content(content: str, cursor) -> Tuple[str, object]:
+    """Return (codec, stored value) for a block's content"""
+    if not compression_enabled():
+        return RAW_CODEC, content
+
+    data = content.encode("utf-8")
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return RAW_CODEC, content
+
+    dictionary_id = _active_dictionary(cursor)
+    compressed = _compressor(dictionary_id, cursor).compress(data)
+    if len(compressed) >= len(data):
+        return RAW_CODEC, content
+
+    codec = f"{ZSTD_CODEC}:{dictionary_id}" if dictionary_id else ZSTD_CODEC
+    return codec, compressed
+
+
+def decode_content(codec: Optional[str], value, cursor) -> str:
+    """Turn a stored value back into text, called only when content is returned"""
+    if not codec or codec == RAW_CODEC:
+        return value
+
+    _, _, dictionary_id = codec.partition(":")
+    decompressor = _decompressor(int(dictionary_id) if dictionary_id else None, cursor)
+    return decompressor.decompress(value).decode("utf-8")
+
+
+def train_dictionary(db, sample_limit: int = 20000) -> int:
+    """Train a shared dictionary on stored block content and make it active"""
+    global _active_dictionary_id, _active_dictionary_expires
+    cursor = db.cursor()
+    # SQLite keeps only the top sample_limit rows while sorting, the corpus is never loaded whole
+    cursor.execute("""
+        SELECT content, content_codec FROM report_blocks
+        ORDER BY random() LIMIT ?
+    """, (sample_limit,))
+    samples = [decode_content(codec, content, cursor).encode("utf-8") for content, codec in cursor.fetchall()]
+    if not samples:
+        raise ValueError("No block content to train a dictionary on")
+
+    dictionary = zstandard.train_dictionary(COMPRESSION_DICTIONARY_SIZE, samples, level=COMPRESSION_LEVEL)
+    cursor.execute("""
+        INSERT INTO compression_dictionaries (dictionary, sample_count)
+        VALUES (?, ?)
+    """, (dictionary.as_bytes(), len(samples)))
+    db.commit()
+
+    _active_dictionary_id = cursor.lastrowid
+    _active_dictionary_expires = time.monotonic() + COMPRESSION_DICTIONARY_RECHECK_SECONDS
+    return _active_dictionary_id
+
+
+def migrate_block_content(db, batch_size: int = 1000) -> int:
+    """Re-encode existing rows, version history included, with the configured codec and active dictionary"""
+    target = None
+    if compression_enabled():
+        dictionary_id = _active_dictionary(db.cursor())
+        target = f"{ZSTD_CODEC}:{dictionary_id}" if dictionary_id else ZSTD_CODEC
+
+    return sum(_migrate_table(db, table, target, batch_size) for table in CONTENT_TABLES)
+
+
+def _migrate_table(db, table: str, target: Optional[str], batch_size: int) -> int:
+    cursor = db.cursor()
+    migrated = 0
+    last_rowid = 0
+    # Walk by rowid so each batch is committed and the table is never locked for long
+    while True:
+        # Read and rewrite a batch under one write lock, an edit committed in between would be lost
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(f"""
+                SELECT rowid, content, content_codec FROM {table}
+                WHERE rowid > ? AND content IS NOT NULL ORDER BY rowid LIMIT ?
+            """, (last_rowid, batch_size))
+            rows = cursor.fetchall()
+
+            updates = []
+            for rowid, content, codec in rows:
+                if codec == target:
+                    continue
+                # Rows too small or incompressible come back raw and are left untouched
+                new_codec, value = encode_content(decode_content(codec, content, cursor), cursor)
+                if new_codec != codec:
+                    updates.append((value, new_codec, rowid))
+
+            cursor.executemany(f"UPDATE {table} SET content = ?, content_codec = ? WHERE rowid = ?", updates)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        if not rows:
+            break
+        migrated += len(updates)
+        last_rowid = rows[-1][0]
+
+    return migrated
+
+
+def content_stats(db) -> dict:
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT content_codec, COUNT(*), SUM(LENGTH(CAST(content AS BLOB)))
+        FROM report_blocks GROUP BY content_codec
+    """)
+    return {codec or RAW_CODEC: {"rows": rows, "bytes": size} for codec, rows, size in cursor.fetchall()}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    from core.write_queue import connect
+
+    # The busy timeout lets the CLI wait for the app's writes instead of failing
+    conn = connect(DATABASE_URL)
+    if command == "train":
+        print(f"Trained dictionary {train_dictionary(conn)}")
+    elif command == "migrate":
+        print(f"Re-encoded {migrate_block_content(conn)} block(s)")
+    else:
+        print(content_stats(conn))
+    conn.close()
@@ -1,10 +1,14 @@
 # File: config.py
 import os
 
-from passlib.context import CryptContext
-
 # Database configuration
 DATABASE_URL = "auth.db"
+SQLITE_BUSY_TIMEOUT_MS = 30000  # how long a connection waits for another process's write lock
+WRITE_BATCH_MAX_JOBS = 64  # mutations committed together by the writer queue
+WRITE_BATCH_RETRIES = 5  # attempts for a batch that still finds the database locked
+# Durability of the writer queue's commits. "FULL" syncs the WAL on every commit. "NORMAL" is
+# faster but a write already reported as committed can be lost on power failure or an OS crash
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "FULL").upper()
 
 # Security configuration
 SECRET_KEY = "your-secret-key-change-in-production"  # Change this in production
@@ -12,15 +16,54 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing, the passlib context is built on first use in auth.get_pwd_context
+PASSWORD_HASH_SCHEMES = ["bcrypt"]
 
 # File upload configuration
 UPLOAD_DIRECTORY = "uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {".pdf", ".docx", ".doc"}
+UPLOAD_GC_GRACE_SECONDS = 3600  # unreferenced uploads younger than this may still be mid-request
+UPLOAD_GC_INTERVAL_SECONDS = int(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", str(6 * 3600)))  # 0 disables the periodic run
+EXPORT_CHUNK_BYTES = 64 * 1024  # NDJSON lines are flushed to the client in chunks of about this size
+
+# Ingest admission control for /upload and /upload-text
+MAX_CONCURRENT_EXTRACTIONS = int(os.getenv("MAX_CONCURRENT_EXTRACTIONS", str(os.cpu_count() or 2)))
+EXTRACTION_QUEUE_SIZE = int(os.getenv("EXTRACTION_QUEUE_SIZE", "32"))  # requests waiting for a slot before 503
+EXTRACTION_QUEUE_TIMEOUT = float(os.getenv("EXTRACTION_QUEUE_TIMEOUT", "30"))  # seconds a request may wait for a slot
+USER_MAX_CONCURRENT_UPLOADS = int(os.getenv("USER_MAX_CONCURRENT_UPLOADS", "2"))
+USER_UPLOAD_RATE = float(os.getenv("USER_UPLOAD_RATE", "0.5"))  # requests per second refilled into each user's bucket
+USER_UPLOAD_BURST = int(os.getenv("USER_UPLOAD_BURST", "10"))
+USER_BYTES_RATE = float(os.getenv("USER_BYTES_RATE", str(512 * 1024)))  # bytes per second
+USER_BYTES_BURST = int(os.getenv("USER_BYTES_BURST", str(5 * MAX_FILE_SIZE)))
+
+# Block segmentation
+MAX_BLOCK_CHARS = 2000  # soft cap, blocks are cut at the next sentence end
+HEADING_MAX_CHARS = 120
+BLOCK_INSERT_BATCH_SIZE = 500  # blocks written per executemany batch
+
+# Block content compression: "none" or "zstd"
+BLOCK_COMPRESSION = os.getenv("BLOCK_COMPRESSION", "none")
+COMPRESSION_LEVEL = 3
+COMPRESSION_MIN_BYTES = 64  # shorter blocks are stored raw
+COMPRESSION_DICTIONARY_SIZE = 112 * 1024
+COMPRESSION_DICTIONARY_RECHECK_SECONDS = 60  # how soon workers pick up a dictionary trained by the CLI
+
+# Report version history: every Nth version is stored in full, the rest as block deltas
+VERSION_CHECKPOINT_INTERVAL = 10
+
+# Near-duplicate tag propagation (MinHash/LSH)
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16  # 8 rows per band, candidate threshold around 0.7
+SHINGLE_SIZE = 3  # words per shingle
+NEAR_DUPLICATE_THRESHOLD = 0.8  # minimum estimated Jaccard similarity to inherit tags
+
+# /metrics is admin-only unless the port is private to the Prometheus scraper
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC") == "1"
 
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+# Per-request profiling, triggered by admins with an "X-Profile: 1" header
+PROFILE_DIRECTORY = "profiles"
+PROFILE_RETENTION = int(os.getenv("PROFILE_RETENTION", "20"))  # newest profiles kept on disk
 
 ALLOWED_ORIGINS = [
     "http://localhost:3000",
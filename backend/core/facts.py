@@ -0,0 +1,63 @@
+# File: core/facts.py
+"""Numeric facts of tagged report blocks, for the calculation checks.
+
+A block contributes the first number in its content to each concept it is
+tagged with. Years, identifiers such as "E1-6" and "Scope 1" are skipped, a
+trailing thousand/million/billion scales the value, and parentheses or a minus
+sign make it negative. The number is parsed when a block is written and stored
+next to its content, validating a report then reads facts without touching the
+text.
+
+Concepts match on their local name, so "esrs:GrossScope1GreenhouseGasEmissions"
+and "esrs_e1_GrossScope1GreenhouseGasEmissions" are the same concept.
+"""
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+_PREFIX = re.compile(r"^[a-z][\w-]*?[:_](?=[A-Z])")
+_NUMBER = re.compile(
+    r"(?<![\w.,\-])(?<!scope )(?<!scopes )"
+    r"(?:(?P<paren>\()|(?P<minus>[-−]))?"
+    r"(?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+    r"(?(paren)\))"
+    r"(?!\.?\w)(?:\s+(?P<scale>thousand|million|billion)\b)?",
+    re.IGNORECASE,
+)
+_SCALES = {"thousand": 1e3, "million": 1e6, "billion": 1e9}
+
+
+def init_facts_db(cursor):
+    """Add the per-block number columns, a NULL half unit marks rows written before them"""
+    cursor.execute("PRAGMA table_info(report_blocks)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if "numeric_value" not in columns:
+        cursor.execute("ALTER TABLE report_blocks ADD COLUMN numeric_value REAL")
+        cursor.execute("ALTER TABLE report_blocks ADD COLUMN numeric_half_unit REAL")
+
+
+@lru_cache(maxsize=65536)
+def concept_key(concept: str) -> str:
+    """Local name of a concept, without its namespace prefix"""
+    return _PREFIX.sub("", concept, count=1)
+
+
+def parse_number(text: str) -> Optional[Tuple[float, float]]:
+    """First numeric value in text as (value, half the unit of its last written digit)"""
+    for match in _NUMBER.finditer(text):
+        number = match.group("number")
+        scale = match.group("scale")
+        integer, _, fraction = number.replace(",", "").partition(".")
+        if not scale and not fraction and "," not in number and 1900 <= int(integer) <= 2100:
+            continue
+        factor = _SCALES[scale.lower()] if scale else 1.0
+        value = float(f"{integer}.{fraction}") * factor
+        if match.group("paren") or match.group("minus"):
+            value = -value
+        return value, 0.5 * 10.0 ** -len(fraction) * factor
+    return None
+
+
+def block_number(content: str) -> Tuple[Optional[float], float]:
+    """Column values stored for a block, (None, 0.0) when it holds no number"""
+    return parse_number(content) or (None, 0.0)
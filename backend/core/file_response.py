@@ -0,0 +1,164 @@
+# File: core/file_response.py
+"""File response with Range, ETag and Last-Modified support.
+
+Starlette 0.27's FileResponse always sends the whole file and never answers
+304. RangeFileResponse serves a single byte range (206), answers conditional
+requests with 304, and rejects unsatisfiable ranges with 416. Multi-range
+requests get the full file, which RFC 9110 allows.
+
+The body is streamed in chunks read off the event loop. There is a path for the
+ASGI "http.response.zerocopysend" extension, which hands the open file to the
+server, but the server has to advertise that extension and neither uvicorn nor
+hypercorn does. Under the servers this app runs on there is no sendfile, every
+byte passes through Python.
+"""
+import os
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive (start, end) of a single byte range, None to ignore the header"""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [value.strip() for value in header.split(",")]
+    # If-None-Match uses weak comparison
+    return "*" in candidates or etag in (value[2:] if value.startswith("W/") else value for value in candidates)
+
+
+def _http_date(header: str) -> Optional[int]:
+    """Seconds since the epoch of an HTTP date in any of the three RFC 9110 formats"""
+    try:
+        parsed = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return None
+    # The asctime format carries no zone, HTTP dates are always GMT
+    return int(parsed.replace(tzinfo=parsed.tzinfo or timezone.utc).timestamp())
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    since = _http_date(header)
+    return since is not None and int(mtime) <= since
+
+
+def _if_range_matches(header: str, etag: str, mtime: float) -> bool:
+    """If-Range holds a strong entity tag or an HTTP date that must match exactly"""
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        # Weak tags never match for If-Range
+        return header == etag
+    return _http_date(header) == int(mtime)
+
+
+class RangeFileResponse(Response):
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, request_headers: Headers, media_type: Optional[str] = None,
+                 filename: Optional[str] = None):
+        self.path = path
+        self.background = None
+        self.media_type = media_type or "application/octet-stream"
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": last_modified,
+            "cache-control": "private, no-cache",
+        }
+        if filename:
+            headers["content-disposition"] = f"inline; filename*=utf-8''{quote(filename)}"
+
+        self.status_code, self.start, self.length = 200, 0, stat.st_size
+        if_none_match = request_headers.get("if-none-match")
+        if_modified_since = request_headers.get("if-modified-since")
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+
+        if (if_none_match and _etag_matches(if_none_match, etag)) or (
+            not if_none_match and if_modified_since and _not_modified_since(if_modified_since, stat.st_mtime)
+        ):
+            self.status_code, self.length = 304, 0
+        elif range_header and (not if_range or _if_range_matches(if_range, etag, stat.st_mtime)):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except RangeNotSatisfiable:
+                self.status_code, self.length = 416, 0
+                headers["content-range"] = f"bytes */{stat.st_size}"
+            else:
+                if byte_range:
+                    start, end = byte_range
+                    self.status_code, self.start, self.length = 206, start, end - start + 1
+                    headers["content-range"] = f"bytes {start}-{end}/{stat.st_size}"
+
+        if self.status_code != 304:
+            headers["content-length"] = str(self.length)
+        self.init_headers(headers)
+        if self.status_code in (304, 416):
+            # Neither carries the file's own media type
+            self.raw_headers = [(k, v) for k, v in self.raw_headers if k != b"content-type"]
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if scope["method"] == "HEAD" or not self.length:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if ZERO_COPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": ZERO_COPY_EXTENSION,
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        remaining = self.length
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            while remaining:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,195 @@
+# File: core/metrics.py
+"""Prometheus metrics for request latency, ingest stages and SQL statements.
+
+Set PROMETHEUS_MULTIPROC_DIR before starting uvicorn with several workers so
+/metrics aggregates all of them. /metrics needs an admin token unless
+METRICS_PUBLIC=1, for deployments where only the scraper can reach it.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_duration_seconds",
+    "Time spent in each stage of file and text ingestion",
+    ["stage"],
+)
+
+SQL_QUERY_SECONDS = Histogram(
+    "sql_query_duration_seconds",
+    "SQLite statement latency from execute to the last row fetched, by verb and table",
+    ["query"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+WRITE_BATCH_SIZE = Histogram(
+    "sqlite_write_batch_jobs",
+    "Mutations committed per writer queue transaction",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+WRITE_BATCH_RETRIED = Counter(
+    "sqlite_write_batch_retries_total",
+    "Writer queue transactions retried because the database was locked",
+)
+
+BYTES_INGESTED = Counter(
+    "ingest_bytes_total",
+    "Bytes received for ingestion",
+    ["source"],
+)
+
+BLOCKS_CREATED = Counter(
+    "blocks_created_total",
+    "Report blocks created by ingestion",
+    ["source"],
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "ingest_admission_active",
+    "Ingest requests holding an extraction slot",
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_WAITING = Gauge(
+    "ingest_admission_waiting",
+    "Ingest requests queued for an extraction slot",
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_WAIT_SECONDS = Histogram(
+    "ingest_admission_wait_seconds",
+    "Time ingest requests spent queued for an extraction slot",
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "ingest_admission_rejections_total",
+    "Ingest requests rejected by admission control",
+    ["reason"],
+)
+
+UPLOAD_FILES_REMOVED = Counter(
+    "upload_files_removed_total",
+    "Files removed from the uploads directory",
+    ["source"],
+)
+
+UPLOAD_BYTES_RECLAIMED = Counter(
+    "upload_bytes_reclaimed_total",
+    "Bytes freed in the uploads directory",
+    ["source"],
+)
+
+EXPORT_ROWS = Counter(
+    "export_rows_total",
+    "NDJSON lines streamed by the export endpoint",
+    ["kind"],
+)
+
+EXPORT_BYTES = Counter(
+    "export_bytes_total",
+    "NDJSON bytes streamed by the export endpoint",
+    ["kind"],
+)
+
+
+@contextmanager
+def observe_stage(stage: str, exclude: "StageTimer" = None):
+    """Time a block as an ingest stage, minus time already attributed to `exclude`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - (exclude.elapsed if exclude else 0.0)
+        INGEST_STAGE_SECONDS.labels(stage).observe(elapsed)
+
+
+class StageTimer:
+    """Accumulates time spent pulling items from a lazy iterable.
+
+    Extraction and segmentation run interleaved as a generator pipeline, this
+    lets the time spent inside the producer be reported as its own stage.
+    """
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def wrap(self, iterable: Iterable) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.elapsed += time.perf_counter() - start
+                return
+            self.elapsed += time.perf_counter() - start
+            yield item
+
+    def observe(self, stage: str, exclude: "StageTimer" = None):
+        INGEST_STAGE_SECONDS.labels(stage).observe(self.elapsed - (exclude.elapsed if exclude else 0.0))
+
+
+def render_metrics():
+    """Return (payload, content type) for the /metrics endpoint"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route_label(self, scope) -> str:
+        if self._route_paths is None:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._route_paths = {route.endpoint: route.path for route in routes if hasattr(route, "endpoint")}
+        # Unmatched paths share one label to keep cardinality bounded
+        return self._route_paths.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(scope["method"], self._route_label(scope), str(status_code)).observe(
+                time.perf_counter() - start
+            )
@@ -0,0 +1,92 @@
+# File: core/minhash.py
+import hashlib
+import re
+from array import array
+from typing import List, Sequence, Tuple
+
+from core.config import MINHASH_PERMUTATIONS, LSH_BANDS, SHINGLE_SIZE
+
+_MAX_HASH = (1 << 32) - 1
+# Odd constant used to rotate values borrowed by empty bins
+_ROTATION = 0x9E3779B1
+
+_ROWS_PER_BAND = MINHASH_PERMUTATIONS // LSH_BANDS
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Reported figures are masked, but not the number naming a scope, category or tier
+_NUMBER_PATTERN = re.compile(r"\b((?:scope|category|tier)\s+\d+)\b|\d[\d.,]*")
+
+
+def _stable_hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def shingles(text: str) -> set:
+    """Hash word n-grams of a block into 64-bit shingles"""
+    # Figures change every reporting year, the surrounding prose does not
+    tokens = _TOKEN_PATTERN.findall(_NUMBER_PATTERN.sub(lambda m: m.group(1) or "0", text.lower()))
+    if not tokens:
+        return set()
+
+    size = min(SHINGLE_SIZE, len(tokens))
+    return {
+        _stable_hash(" ".join(tokens[i:i + size]).encode("utf-8"))
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+def compute_signature(text: str) -> List[int]:
+    """Compute the MinHash signature of a block's content.
+
+    Uses one-permutation hashing: each shingle is hashed once and lands in one of
+    MINHASH_PERMUTATIONS bins that keep their minimum, so cost is linear in the
+    number of shingles. Empty bins borrow the next filled bin's value, rotated by
+    distance, which keeps signatures of short blocks comparable.
+    """
+    hashed = shingles(text)
+    if not hashed:
+        return []
+
+    bins = [None] * MINHASH_PERMUTATIONS
+    for h in hashed:
+        index = h % MINHASH_PERMUTATIONS
+        value = (h >> 16) & _MAX_HASH
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+
+    signature = []
+    for index in range(MINHASH_PERMUTATIONS):
+        distance = 0
+        value = bins[index]
+        while value is None:
+            distance += 1
+            value = bins[(index + distance) % MINHASH_PERMUTATIONS]
+        signature.append((value + distance * _ROTATION) & _MAX_HASH)
+    return signature
+
+
+def band_keys(signature: Sequence[int]) -> List[Tuple[int, int]]:
+    """Split a signature into LSH bands and hash each band to a bucket key"""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND]
+        digest = hashlib.blake2b(array("I", rows).tobytes(), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, "little", signed=True)))
+    return keys
+
+
+def estimate_similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimate Jaccard similarity from two signatures"""
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+def pack_signature(signature: Sequence[int]) -> bytes:
+    return array("I", signature).tobytes()
+
+
+def unpack_signature(data: bytes) -> List[int]:
+    signature = array("I")
+    signature.frombytes(data)
+    return signature.tolist()
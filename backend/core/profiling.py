@@ -0,0 +1,212 @@
+# File: core/profiling.py
+"""Opt-in cProfile capture of single requests.
+
+An admin adds an "X-Profile: 1" header to any request, "true", "yes" and "on"
+are accepted too. The response carries an X-Profile-Id header, and the profile
+is stored under PROFILE_DIRECTORY for download from /api/admin/profiles. Only
+the newest PROFILE_RETENTION profiles are kept.
+
+The profile covers the event loop thread plus work handed to other threads
+through profile_call or bind_profile, so it also contains whatever other
+requests interleave with the profiled one on the loop. Only one request is
+profiled at a time, a second X-Profile request while one is running is served
+normally. From Python 3.12 only one profiler can be active at a time, so
+functions on other threads run unprofiled while the request's profiler is on.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from io import StringIO
+from typing import List, Optional
+
+from core.config import PROFILE_DIRECTORY, PROFILE_RETENTION
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Header values that turn profiling on, anything else such as "0" or "false" leaves it off
+PROFILE_HEADER_VALUES = {b"1", b"true", b"yes", b"on"}
+
+_profile_lock = threading.Lock()
+_profile_id_pattern = re.compile(r"[0-9a-f]{32}")
+# Profilers of threadpool calls made on behalf of the request being profiled
+_thread_profilers: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("thread_profilers", default=None)
+
+
+def profile_call(func, *args):
+    """Call func, adding it to the current request's profile if one is being captured.
+
+    cProfile only sees the thread it runs on, wrap functions passed to
+    run_in_threadpool with this so their time shows up in the profile.
+    """
+    profilers = _thread_profilers.get()
+    if profilers is None:
+        return func(*args)
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler, the request's own profiler holds it
+        return func(*args)
+    try:
+        return func(*args)
+    finally:
+        profiler.disable()
+        profilers.append(profiler)
+
+
+def bind_profile(func):
+    """Return func bound to the request being profiled, for threads that do not inherit context"""
+    profilers = _thread_profilers.get()
+    if profilers is None:
+        return func
+
+    def profiled(*args):
+        token = _thread_profilers.set(profilers)
+        try:
+            return profile_call(func, *args)
+        finally:
+            _thread_profilers.reset(token)
+    return profiled
+
+
+def _wants_profile(scope) -> bool:
+    return any(
+        name == PROFILE_HEADER and value.strip().lower() in PROFILE_HEADER_VALUES
+        for name, value in scope["headers"]
+    )
+
+
+async def _admin_user(scope) -> Optional[dict]:
+    """Resolve the bearer token with the same checks as require_role("admin")"""
+    from fastapi import HTTPException
+    from auth import get_scope_user, require_role
+
+    user = await get_scope_user(scope)
+    if user is None:
+        return None
+    try:
+        return require_role("admin")(user)
+    except HTTPException:
+        return None
+
+
+def _profile_file(profile_id: str, extension: str) -> str:
+    return os.path.join(PROFILE_DIRECTORY, f"{profile_id}{extension}")
+
+
+def save_profile(profile_id: str, profilers: List[cProfile.Profile], meta: dict):
+    """Write the merged pstats dump and its metadata, then drop profiles beyond the retention limit"""
+    os.makedirs(PROFILE_DIRECTORY, exist_ok=True)
+    stats = pstats.Stats(*profilers)
+    stats.dump_stats(_profile_file(profile_id, ".prof"))
+    with open(_profile_file(profile_id, ".json"), "w") as f:
+        json.dump(meta, f)
+
+    for stale in list_profiles()[PROFILE_RETENTION:]:
+        for extension in (".prof", ".json"):
+            try:
+                os.remove(_profile_file(stale["id"], extension))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[dict]:
+    """Metadata of stored profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIRECTORY):
+        return []
+
+    profiles = []
+    for name in os.listdir(PROFILE_DIRECTORY):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIRECTORY, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda meta: meta["created_at"], reverse=True)
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    if not _profile_id_pattern.fullmatch(profile_id):
+        return None
+    path = _profile_file(profile_id, ".prof")
+    return path if os.path.exists(path) else None
+
+
+def profile_summary(path: str, limit: int = 60) -> str:
+    """Plain-text pstats listing sorted by cumulative time"""
+    out = StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling admin requests that carry the X-Profile header.
+
+    Requests without the header only pay for a scan of the header list.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        user = await _admin_user(scope)
+        if user is None or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send, user)
+        finally:
+            _profile_lock.release()
+
+    async def _profile(self, scope, receive, send, user):
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler, another tool such as coverage holds it
+            await self.app(scope, receive, send)
+            return
+        thread_profilers = []
+        token = _thread_profilers.set(thread_profilers)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            _thread_profilers.reset(token)
+            save_profile(profile_id, [profiler] + thread_profilers, {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "user": user["email"],
+                "created_at": datetime.utcnow().isoformat(),
+            })
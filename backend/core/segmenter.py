@@ -0,0 +1,137 @@
+# File: core/segmenter.py
+import re
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+from core.config import MAX_BLOCK_CHARS, HEADING_MAX_CHARS
+
+# A segment is a (block type, content) pair, block types match the frontend ReportBlock union
+Segment = Tuple[str, str]
+
+_TERMINAL_PUNCTUATION = (".", "!", "?", ":", ";")
+_BULLETS = "•▪◦●○■□·*-–"
+_LIST_ITEM = re.compile(r"^\s*(?:[•▪◦●○■□·*\-–]|\(?\d{1,2}[.)]|\(?[a-z][.)])\s+\S")
+_NUMBERED_HEADING = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[A-Z]{1,4}\d*-\d+(?:\.\d+)?|ESRS\s+[A-Z0-9-]+)\s+\S")
+_TABLE_SEPARATOR = re.compile(r"\t|\s\|\s|\s{3,}")
+_NUMBER_TOKEN = re.compile(r"(?<!\S)[(\-–]?\d[\d.,]*%?\)?(?!\S)")
+
+# Paragraph ends when a line finishes a sentence and is clearly shorter than the text width
+_SHORT_LINE_RATIO = 0.8
+_WIDTH_WINDOW = 20
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of at most `size` items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def is_table_row(line: str) -> bool:
+    if ("\t" in line or "|" in line or "   " in line) and len(_TABLE_SEPARATOR.findall(line)) >= 2:
+        return True
+
+    # Rows of figures, PyPDF2 collapses column gaps to single spaces
+    numbers = len(_NUMBER_TOKEN.findall(line))
+    return numbers >= 3 and numbers * 2 >= len(line.split())
+
+
+def is_list_item(line: str) -> bool:
+    return bool(_LIST_ITEM.match(line))
+
+
+def is_heading(line: str) -> bool:
+    text = line.strip()
+    if len(text) > HEADING_MAX_CHARS or text[0] in _BULLETS or text.endswith((".", ",", ";")):
+        return False
+
+    if _NUMBERED_HEADING.match(text):
+        return True
+
+    if text.isupper() and sum(1 for c in text if c.isalpha()) >= 3:
+        return True
+
+    # Title Case: most significant words start with a capital letter
+    words = [word for word in text.split() if len(word) > 3]
+    if not words or not text[0].isupper():
+        return False
+    capitalized = sum(1 for word in words if word[0].isupper())
+    return capitalized / len(words) >= 0.6
+
+
+def _join_line(buffer: List[str], line: str):
+    # Re-join words hyphenated across a PDF line break
+    if buffer and buffer[-1].endswith("-") and line[:1].islower():
+        buffer[-1] = buffer[-1][:-1] + line
+    else:
+        buffer.append(line)
+
+
+def segment_lines(lines: Iterable[str]) -> Iterator[Segment]:
+    """Group a stream of text lines into typed blocks.
+
+    Only the block under construction is held in memory, so pages or paragraphs
+    can be fed straight from the extractor. Blank lines always end a block.
+    """
+    buffer: List[str] = []
+    buffer_type = "paragraph"
+    buffer_chars = 0
+    widths = deque(maxlen=_WIDTH_WINDOW)
+
+    def flush() -> Iterator[Segment]:
+        nonlocal buffer, buffer_type, buffer_chars
+        if buffer:
+            yield buffer_type, " ".join(buffer)
+        buffer, buffer_type, buffer_chars = [], "paragraph", 0
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            yield from flush()
+            continue
+
+        widths.append(len(line))
+        sentence_ended = not buffer or buffer[-1].endswith(_TERMINAL_PUNCTUATION)
+
+        if is_table_row(line):
+            yield from flush()
+            yield "table", " | ".join(part.strip() for part in _TABLE_SEPARATOR.split(line) if part.strip())
+            continue
+
+        if sentence_ended and is_heading(line):
+            yield from flush()
+            yield "heading", line
+            continue
+
+        if is_list_item(line):
+            yield from flush()
+            buffer_type = "list"
+
+        _join_line(buffer, line)
+        buffer_chars += len(line) + 1
+
+        if line.endswith(_TERMINAL_PUNCTUATION) and (
+            len(line) < max(widths) * _SHORT_LINE_RATIO or buffer_chars >= MAX_BLOCK_CHARS
+        ):
+            yield from flush()
+        elif buffer_chars >= 2 * MAX_BLOCK_CHARS:
+            # No sentence boundary in sight, cut anyway to keep blocks renderable
+            yield from flush()
+
+    yield from flush()
+
+
+def iter_text_lines(text: str) -> Iterator[str]:
+    """Lazily iterate the lines of an in-memory string"""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find("\n", start)
+        if end == -1:
+            end = length
+        yield text[start:end]
+        start = end + 1
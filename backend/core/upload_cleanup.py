@@ -0,0 +1,180 @@
+# File: core/upload_cleanup.py
+"""Background removal of uploaded files and garbage collection of orphans.
+
+Deleting a report only commits the database change, the file is handed to a
+reaper thread. collect_orphaned_uploads reconciles UPLOAD_DIRECTORY against
+reports.file_path and removes unreferenced files older than a grace period,
+which covers uploads whose database insert failed or rolled back. The same
+run deletes report blocks left behind by a worker that died mid-upload, see
+database.collect_orphaned_blocks. It runs periodically from the app lifespan,
+first one interval after startup, and on demand:
+
+    python -m core.upload_cleanup [--dry-run] [--force]
+
+A database where no report references a file while the uploads directory has
+files is most likely the wrong or a fresh database, for instance a relative
+DATABASE_URL resolved from another working directory. Collection is refused
+then unless forced.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from core.config import DATABASE_URL, UPLOAD_DIRECTORY, UPLOAD_GC_GRACE_SECONDS, UPLOAD_GC_INTERVAL_SECONDS
+from core.metrics import UPLOAD_FILES_REMOVED, UPLOAD_BYTES_RECLAIMED
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def remove_upload(path: str, source: str) -> int:
+    """Remove a file and return the bytes freed, 0 if it was already gone"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    UPLOAD_FILES_REMOVED.labels(source).inc()
+    UPLOAD_BYTES_RECLAIMED.labels(source).inc(size)
+    return size
+
+
+class FileReaper:
+    """Removes files on a background thread so requests return after the DB commit"""
+
+    def __init__(self):
+        self._paths = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def schedule(self, path: str):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="upload-reaper", daemon=True)
+                    self._thread.start()
+        self._paths.put(path)
+
+    def stop(self, timeout: float = None):
+        """Remove whatever is still queued and stop the thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._paths.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            path = self._paths.get()
+            if path is _STOP:
+                return
+            try:
+                remove_upload(path, "delete")
+            except OSError as e:
+                # The periodic GC picks the file up again once it is unreferenced
+                logger.warning("Could not remove %s: %s", path, e)
+
+
+_reaper = FileReaper()
+
+
+def schedule_file_removal(path: Optional[str]):
+    if path:
+        _reaper.schedule(path)
+
+
+def stop_file_reaper():
+    _reaper.stop()
+
+
+def collect_orphaned_uploads(grace_seconds: float = UPLOAD_GC_GRACE_SECONDS, dry_run: bool = False,
+                             force: bool = False) -> dict:
+    """Remove files in the uploads directory that no report references"""
+    from core.write_queue import connect
+
+    stats = {"scanned": 0, "orphaned": 0, "removed": 0, "bytes_reclaimed": 0, "dry_run": dry_run, "refused": False}
+    if not os.path.isdir(UPLOAD_DIRECTORY):
+        return stats
+
+    # Files are listed before references are read, so a report committed in between still protects its file
+    cutoff = time.time() - grace_seconds
+    candidates = []
+    with os.scandir(UPLOAD_DIRECTORY) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            stats["scanned"] += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime < cutoff:
+                candidates.append((entry.path, stat.st_size))
+
+    conn = connect(DATABASE_URL)
+    try:
+        rows = conn.execute("SELECT file_path FROM reports WHERE file_path IS NOT NULL").fetchall()
+    finally:
+        conn.close()
+    referenced = {os.path.realpath(row[0]) for row in rows}
+    if not referenced and stats["scanned"] and not force:
+        logger.warning("Upload GC refused: %s references no uploads but %s holds %d file(s)",
+                       os.path.abspath(DATABASE_URL), os.path.abspath(UPLOAD_DIRECTORY), stats["scanned"])
+        stats["refused"] = True
+        return stats
+
+    for path, size in candidates:
+        if os.path.realpath(path) in referenced:
+            continue
+        stats["orphaned"] += 1
+        if dry_run:
+            stats["bytes_reclaimed"] += size
+            continue
+        try:
+            freed = remove_upload(path, "gc")
+        except OSError as e:
+            logger.warning("Could not remove %s: %s", path, e)
+            continue
+        if freed:
+            stats["removed"] += 1
+            stats["bytes_reclaimed"] += freed
+
+    return stats
+
+
+async def run_periodic_gc(interval: float = UPLOAD_GC_INTERVAL_SECONDS):
+    """Lifespan task running collect_orphaned_uploads every `interval` seconds, starting one interval in"""
+    from starlette.concurrency import run_in_threadpool
+    from database import collect_orphaned_blocks
+
+    while True:
+        # Waiting first keeps restarts and every worker's startup from sweeping the directory at once
+        await asyncio.sleep(interval)
+        try:
+            stats = await run_in_threadpool(collect_orphaned_uploads)
+            if stats["removed"]:
+                logger.info("Upload GC removed %d file(s), %d bytes", stats["removed"], stats["bytes_reclaimed"])
+            reports = await run_in_threadpool(collect_orphaned_blocks)
+            if reports:
+                logger.info("Upload GC removed the blocks of %d unfinished upload(s)", reports)
+        except Exception:
+            logger.exception("Upload GC failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove uploads no report references")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--grace-seconds", type=float, default=UPLOAD_GC_GRACE_SECONDS)
+    parser.add_argument("--force", action="store_true", help="collect even if no report references any upload")
+    args = parser.parse_args()
+    print(collect_orphaned_uploads(args.grace_seconds, args.dry_run, args.force))
+    if not args.dry_run:
+        from database import collect_orphaned_blocks
+        from core.write_queue import stop_write_queue
+
+        print({"orphaned_block_reports": collect_orphaned_blocks(args.grace_seconds)})
+        stop_write_queue()
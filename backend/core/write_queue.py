@@ -0,0 +1,272 @@
+# File: core/write_queue.py
+"""Single SQLite writer per process with group commit.
+
+Mutations are submitted as functions taking a cursor. The writer thread takes
+everything queued at that moment (up to WRITE_BATCH_MAX_JOBS), runs each job in
+its own SAVEPOINT inside one BEGIN IMMEDIATE transaction and commits once, so a
+burst of small writes costs a single commit. A job that raises only rolls back
+its own savepoint. Reads keep using their own connections and, with WAL, are
+not blocked by the writer.
+
+connect() is the one way the app opens SQLite. Its connections time every
+statement, from execute to the last row fetched, into sql_query_duration_seconds
+labelled by verb and table, "select_report_blocks" or "commit".
+
+With several uvicorn workers there is one writer per process. They take the
+database write lock with BEGIN IMMEDIATE and wait up to SQLITE_BUSY_TIMEOUT_MS
+for each other. A batch that still finds the database locked is retried as a
+whole, which is safe because nothing from it was committed.
+"""
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable
+
+from core.config import (
+    DATABASE_URL,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_SYNCHRONOUS,
+    WRITE_BATCH_MAX_JOBS,
+    WRITE_BATCH_RETRIES,
+)
+from core.metrics import SQL_QUERY_SECONDS, WRITE_BATCH_SIZE, WRITE_BATCH_RETRIED
+from core.profiling import bind_profile
+
+_STOP = object()
+# SQLite reads an unknown synchronous value as NORMAL, only these are accepted
+_SYNCHRONOUS_MODES = ("FULL", "NORMAL")
+_VERB = re.compile(r"\s*(\w+)")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+_INNERMOST_PARENS = re.compile(r"\([^()]*\)")
+
+
+@lru_cache(maxsize=1024)
+def query_label(sql: str) -> str:
+    """Metric label of a statement, its verb and first table"""
+    verb = _VERB.match(sql)
+    # Drop parenthesised parts from the inside out, the table of a subquery is not the statement's
+    outer = sql
+    while True:
+        stripped = _INNERMOST_PARENS.sub(" ", outer)
+        if stripped == outer:
+            break
+        outer = stripped
+    table = _TABLE.search(outer)
+    verb = verb.group(1).lower() if verb else "unknown"
+    return f"{verb}_{table.group(1).lower()}" if table and verb in ("select", "insert", "update", "delete", "replace") else verb
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor observing each statement once its rows are exhausted, or at the next execute"""
+
+    _label = None
+    _elapsed = 0.0
+
+    def _observe(self):
+        if self._label is not None:
+            SQL_QUERY_SECONDS.labels(self._label).observe(self._elapsed)
+            self._label = None
+
+    def _timed(self, method, sql, *args):
+        self._observe()
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self._label, self._elapsed = query_label(sql), time.perf_counter() - start
+            # Statements without a result set are done once executed
+            if self.description is None:
+                self._observe()
+
+    def _fetched(self, start: float, done: bool):
+        self._elapsed += time.perf_counter() - start
+        if done:
+            self._observe()
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        size = self.arraysize if size is None else size
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, True)
+            raise
+        self._fetched(start, False)
+        return row
+
+    def close(self):
+        self._observe()
+        super().close()
+
+    def __del__(self):
+        self._observe()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection's shortcuts create plain cursors, route them through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database: str = DATABASE_URL, **kwargs) -> sqlite3.Connection:
+    """Open a timed connection that waits for the write lock instead of failing with "database is locked" """
+    return sqlite3.connect(database, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, factory=InstrumentedConnection, **kwargs)
+
+
+def is_locked_error(error: Exception) -> bool:
+    message = str(error)
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class WriteQueue:
+    def __init__(self, database: str = DATABASE_URL, synchronous: str = SQLITE_SYNCHRONOUS):
+        if synchronous not in _SYNCHRONOUS_MODES:
+            raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(_SYNCHRONOUS_MODES)}, not {synchronous!r}")
+        self.database = database
+        self.synchronous = synchronous
+        self._jobs = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Commit whatever is queued and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._jobs.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def submit(self, func: Callable, *args) -> Future:
+        future = Future()
+        if self._thread is None:
+            self.start()
+        # Profiled requests keep their write jobs in the profile
+        self._jobs.put((bind_profile(func), args, future))
+        return future
+
+    def execute(self, func: Callable, *args):
+        """Run func(cursor, *args) on the writer and return its result once committed"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("execute_write cannot be nested inside a write job")
+        return self.submit(func, *args).result()
+
+    def _run(self):
+        conn = connect(self.database, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        try:
+            stopping = False
+            while not stopping:
+                batch = []
+                job = self._jobs.get()
+                while True:
+                    if job is _STOP:
+                        stopping = True
+                    elif job[2].set_running_or_notify_cancel():
+                        batch.append(job)
+                    if stopping or len(batch) >= WRITE_BATCH_MAX_JOBS:
+                        break
+                    try:
+                        job = self._jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._commit_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch):
+        for attempt in range(WRITE_BATCH_RETRIES):
+            try:
+                outcomes = self._apply(conn, batch)
+                break
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if not is_locked_error(e) or attempt == WRITE_BATCH_RETRIES - 1:
+                    for _, _, future in batch:
+                        future.set_exception(e)
+                    return
+                WRITE_BATCH_RETRIED.inc()
+                time.sleep(0.05 * 2 ** attempt)
+
+        WRITE_BATCH_SIZE.observe(len(batch))
+        for (_, _, future), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _apply(self, conn: sqlite3.Connection, batch):
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+
+        outcomes = []
+        for func, args, _ in batch:
+            cursor.execute("SAVEPOINT write_job")
+            try:
+                value = func(cursor, *args)
+            except Exception as e:
+                # Lock errors abort the whole batch so it can be retried
+                if is_locked_error(e):
+                    raise
+                cursor.execute("ROLLBACK TO write_job")
+                outcomes.append((False, e))
+            else:
+                outcomes.append((True, value))
+            cursor.execute("RELEASE write_job")
+
+        cursor.execute("COMMIT")
+        return outcomes
+
+
+_write_queue = WriteQueue()
+
+
+def execute_write(func: Callable, *args):
+    """Run func(cursor, *args) through the process-wide writer queue"""
+    return _write_queue.execute(func, *args)
+
+
+def stop_write_queue():
+    _write_queue.stop()
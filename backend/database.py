@@ -1,19 +1,80 @@
 # File: database.py - Add these functions to your existing database.py
+import json
 import sqlite3
-from typing import List, Optional, Generator
-from model import ReportDocument, ReportBlock
-from core.config import DATABASE_URL
+from itertools import chain, groupby
+from typing import Iterable, Iterator, List, Optional, Generator, Tuple
+from model import ReportDocument, ReportBlock, ReportUpdate, ReportVersion
+from core.config import (
+    DATABASE_URL,
+    NEAR_DUPLICATE_THRESHOLD,
+    BLOCK_INSERT_BATCH_SIZE,
+    UPLOAD_GC_GRACE_SECONDS,
+    VERSION_CHECKPOINT_INTERVAL,
+)
+from core.segmenter import batched
+from core.compression import init_compression_db, encode_content, decode_content
+from core.facts import init_facts_db, block_number, parse_number
+from core.write_queue import connect, execute_write
+from core.minhash import (
+    compute_signature,
+    band_keys,
+    estimate_similarity,
+    pack_signature,
+    unpack_signature,
+)
+
+# Upper bound on LSH candidates compared per block, keeps lookups cheap for boilerplate
+MAX_NEAR_DUPLICATE_CANDIDATES = 50
+
+
+class BlockIdConflict(Exception):
+    pass
 
 
 def get_db():
-    conn = sqlite3.connect(DATABASE_URL, check_same_thread=False)
+    conn = connect(DATABASE_URL, check_same_thread=False)
     try:
         yield conn
     finally:
         conn.close()
+
+def init_users_db():
+    """Initialize user and refresh token tables"""
+    conn = connect(DATABASE_URL)
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            username TEXT UNIQUE NOT NULL,
+            hashed_password TEXT NOT NULL,
+            full_name TEXT,
+            is_active BOOLEAN DEFAULT TRUE,
+            is_verified BOOLEAN DEFAULT FALSE,
+            role TEXT DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS refresh_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            token TEXT NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    
+    conn.commit()
+    conn.close()
+
 def init_reports_db():
     """Initialize reports database tables"""
-    conn = sqlite3.connect(DATABASE_URL)
+    conn = connect(DATABASE_URL)
     cursor = conn.cursor()
     
     # Reports table
@@ -54,41 +115,292 @@ def init_reports_db():
             FOREIGN KEY (block_id) REFERENCES report_blocks (id)
         )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_block_tags_block ON block_tags (block_id)")
+    
+    # Codec column and shared dictionaries for compressed block content
+    init_compression_db(cursor)
+    
+    # Number of each block for the calculation checks, parsed once on write
+    init_facts_db(cursor)
+    
+    # MinHash signatures and LSH buckets of tagged blocks, the donors for tag propagation
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS block_signatures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            block_id TEXT UNIQUE NOT NULL,
+            user_id INTEGER NOT NULL,
+            signature BLOB NOT NULL,
+            FOREIGN KEY (block_id) REFERENCES report_blocks (id)
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS block_lsh_buckets (
+            user_id INTEGER NOT NULL,
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            signature_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, band, bucket, signature_id),
+            FOREIGN KEY (signature_id) REFERENCES block_signatures (id)
+        ) WITHOUT ROWID
+    """)
+    
+    # Report version history: full checkpoints plus block-level deltas in between
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_versions (
+            report_id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            is_checkpoint BOOLEAN NOT NULL,
+            changed_blocks INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (report_id, version),
+            FOREIGN KEY (report_id) REFERENCES reports (id)
+        )
+    """)
+    
+    # operation is 'put' (full block), 'meta' (order/type/tags only) or 'delete'
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_version_blocks (
+            report_id TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            block_id TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            block_order INTEGER,
+            type TEXT,
+            content,
+            content_codec TEXT,
+            tags TEXT,
+            FOREIGN KEY (report_id, version) REFERENCES report_versions (report_id, version)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_report_version_blocks
+        ON report_version_blocks (report_id, version)
+    """)
     
     conn.commit()
     conn.close()
 
-def create_report(report: ReportDocument, user_id: int, db) -> bool:
-    """Save report to database"""
-    try:
-        cursor = db.cursor()
-        
-        # Insert report
+def find_near_duplicate_tags(signature: List[int], user_id: int, cursor, report_id: Optional[str] = None) -> List[str]:
+    """Return the tags of the most similar previously tagged block, if any.
+
+    Blocks of a report still being streamed in have no report row yet, they
+    are only donors within that report itself, `report_id`.
+    """
+    # LSH candidates that share at least one band, one primary key range lookup per band
+    candidate_ids = []
+    for band, bucket in band_keys(signature):
         cursor.execute("""
-            INSERT INTO reports (id, user_id, title, file_path, file_size, file_type)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (report.id, user_id, report.title, report.file_path, report.file_size, report.file_type))
+            SELECT signature_id FROM block_lsh_buckets
+            WHERE user_id = ? AND band = ? AND bucket = ?
+            LIMIT ?
+        """, (user_id, band, bucket, MAX_NEAR_DUPLICATE_CANDIDATES))
+        candidate_ids.extend(row[0] for row in cursor.fetchall() if row[0] not in candidate_ids)
+        if len(candidate_ids) >= MAX_NEAR_DUPLICATE_CANDIDATES:
+            break
+    if not candidate_ids:
+        return []
+    
+    cursor.execute(f"""
+        SELECT bs.block_id, bs.signature FROM block_signatures bs
+        JOIN report_blocks rb ON rb.id = bs.block_id
+        WHERE bs.id IN ({", ".join("?" * len(candidate_ids))})
+        AND (rb.report_id = ? OR EXISTS (SELECT 1 FROM reports r WHERE r.id = rb.report_id))
+    """, [*candidate_ids, report_id])
+    
+    best_block_id, best_similarity = None, NEAR_DUPLICATE_THRESHOLD
+    for block_id, packed in cursor.fetchall():
+        similarity = estimate_similarity(signature, unpack_signature(packed))
+        if similarity >= best_similarity:
+            best_block_id, best_similarity = block_id, similarity
+    
+    if best_block_id is None:
+        return []
+    
+    cursor.execute("SELECT tag FROM block_tags WHERE block_id = ? ORDER BY id", (best_block_id,))
+    return [row[0] for row in cursor.fetchall()]
+
+def index_block_signature(block_id: str, signature: List[int], user_id: int, cursor):
+    """Add a tagged block to the user's near-duplicate index"""
+    cursor.execute("""
+        INSERT INTO block_signatures (block_id, user_id, signature)
+        VALUES (?, ?, ?)
+    """, (block_id, user_id, pack_signature(signature)))
+    signature_id = cursor.lastrowid
+    cursor.executemany("""
+        INSERT INTO block_lsh_buckets (user_id, band, bucket, signature_id)
+        VALUES (?, ?, ?, ?)
+    """, [(user_id, band, bucket, signature_id) for band, bucket in band_keys(signature)])
+
+def unindex_blocks(block_ids: List[str], cursor):
+    """Remove blocks from the near-duplicate index"""
+    if not block_ids:
+        return
+    
+    cursor.execute(f"""
+        SELECT id, user_id, signature FROM block_signatures
+        WHERE block_id IN ({", ".join("?" * len(block_ids))})
+    """, block_ids)
+    rows = cursor.fetchall()
+    
+    # Bucket keys are recomputed from the signature so deletes hit the primary key
+    cursor.executemany("""
+        DELETE FROM block_lsh_buckets
+        WHERE user_id = ? AND band = ? AND bucket = ? AND signature_id = ?
+    """, [
+        (user_id, band, bucket, signature_id)
+        for signature_id, user_id, packed in rows
+        for band, bucket in band_keys(unpack_signature(packed))
+    ])
+    cursor.executemany("DELETE FROM block_signatures WHERE id = ?", [(row[0],) for row in rows])
+
+def insert_report_blocks(report_id: str, blocks: List[ReportBlock], start_order: int, user_id: int, cursor,
+                         block_signatures: Optional[List[List[int]]] = None):
+    """Insert one batch of blocks with their tags and near-duplicate index entries"""
+    block_rows, tag_rows, signatures = [], [], []
+    if block_signatures is None:
+        block_signatures = [compute_signature(block.content) for block in blocks]
+    
+    for i, (block, signature) in enumerate(zip(blocks, block_signatures), start=start_order):
+        if signature and not block.tags:
+            block.tags = find_near_duplicate_tags(signature, user_id, cursor, report_id)
         
-        # Insert blocks
-        for i, block in enumerate(report.blocks):
-            cursor.execute("""
-                INSERT INTO report_blocks (id, report_id, content, type, block_order)
-                VALUES (?, ?, ?, ?, ?)
-            """, (block.id, report.id, block.content, block.type, i))
-            
-            # Insert tags for this block
-            for tag in block.tags:
-                cursor.execute("""
-                    INSERT INTO block_tags (block_id, tag)
-                    VALUES (?, ?)
-                """, (block.id, tag))
+        codec, content = encode_content(block.content, cursor)
+        block_rows.append((block.id, report_id, content, codec, block.type, i, *block_number(block.content)))
+        tag_rows.extend((block.id, tag) for tag in block.tags)
+        if signature and block.tags:
+            signatures.append((block.id, signature))
+    
+    cursor.executemany("""
+        INSERT INTO report_blocks
+        (id, report_id, content, content_codec, type, block_order, numeric_value, numeric_half_unit)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, block_rows)
+    
+    cursor.executemany("""
+        INSERT INTO block_tags (block_id, tag)
+        VALUES (?, ?)
+    """, tag_rows)
+    
+    for block_id, signature in signatures:
+        index_block_signature(block_id, signature, user_id, cursor)
+
+def create_report(report: ReportDocument, user_id: int, db, blocks: Optional[Iterable[ReportBlock]] = None) -> bool:
+    """Save report to database, inheriting tags from near-duplicate blocks.
+
+    Given `blocks`, the report is filled from that stream instead: each batch
+    of BLOCK_INSERT_BATCH_SIZE is written as soon as it is produced and then
+    appended to report.blocks, and the report row goes in last so the report
+    only shows up complete. Returns False, leaving nothing behind, for an
+    empty stream.
+    """
+    if blocks is None:
+        # Signatures are CPU-bound, compute them before taking the write lock
+        signatures = [compute_signature(block.content) for block in report.blocks]
+        return execute_write(_create_report, report, user_id, signatures)
+    
+    try:
+        for batch in batched(blocks, BLOCK_INSERT_BATCH_SIZE):
+            signatures = [compute_signature(block.content) for block in batch]
+            execute_write(_insert_report_batch, report.id, batch, len(report.blocks), user_id, signatures)
+            report.blocks.extend(batch)
+        if not report.blocks:
+            return False
+        execute_write(_insert_report_row, report, user_id)
+    except Exception:
+        # Batches already committed belong to a report that will never exist
+        if report.blocks:
+            execute_write(_discard_report_blocks, report.id)
+        raise
+    
+    return True
+
+def _insert_report_row(cursor, report: ReportDocument, user_id: int):
+    cursor.execute("""
+        INSERT INTO reports (id, user_id, title, file_path, file_size, file_type)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (report.id, user_id, report.title, report.file_path, report.file_size, report.file_type))
+
+def _insert_report_batch(cursor, report_id: str, blocks: List[ReportBlock], start_order: int, user_id: int,
+                         signatures: List[List[int]]):
+    insert_report_blocks(report_id, blocks, start_order, user_id, cursor, signatures)
+
+def _discard_report_blocks(cursor, report_id: str):
+    cursor.execute("SELECT id FROM report_blocks WHERE report_id = ?", (report_id,))
+    block_ids = [row[0] for row in cursor.fetchall()]
+    for batch in batched(block_ids, BLOCK_INSERT_BATCH_SIZE):
+        unindex_blocks(batch, cursor)
+        cursor.execute(f"DELETE FROM block_tags WHERE block_id IN ({', '.join('?' * len(batch))})", batch)
+    cursor.execute("DELETE FROM report_blocks WHERE report_id = ?", (report_id,))
+
+def collect_orphaned_blocks(grace_seconds: float = UPLOAD_GC_GRACE_SECONDS) -> int:
+    """Delete blocks whose report row was never written, returns the number of reports cleaned up"""
+    return execute_write(_collect_orphaned_blocks, grace_seconds)
+
+def _collect_orphaned_blocks(cursor, grace_seconds: float) -> int:
+    # A worker that died mid-upload leaves its committed batches behind, an upload
+    # still streaming looks the same, so only reports idle for the grace period go
+    cursor.execute("""
+        SELECT rb.report_id FROM report_blocks rb
+        WHERE NOT EXISTS (SELECT 1 FROM reports r WHERE r.id = rb.report_id)
+        GROUP BY rb.report_id
+        HAVING MAX(rb.created_at) < datetime('now', ?)
+    """, (f"-{int(grace_seconds)} seconds",))
+    report_ids = [row[0] for row in cursor.fetchall()]
+    for report_id in report_ids:
+        _discard_report_blocks(cursor, report_id)
+    return len(report_ids)
+
+def _create_report(cursor, report: ReportDocument, user_id: int, signatures: List[List[int]]) -> bool:
+    _insert_report_row(cursor, report, user_id)
+    
+    # Insert blocks in batches
+    for start in range(0, len(report.blocks), BLOCK_INSERT_BATCH_SIZE):
+        end = start + BLOCK_INSERT_BATCH_SIZE
+        insert_report_blocks(report.id, report.blocks[start:end], start, user_id, cursor, signatures[start:end])
+    
+    return True
+
+def get_report_blocks(report_id: str, cursor) -> List[ReportBlock]:
+    """Get the blocks of a report, decoding compressed content"""
+    cursor.execute("""
+        SELECT rb.id, rb.content, rb.type, rb.block_order, rb.content_codec
+        FROM report_blocks rb
+        WHERE rb.report_id = ?
+        ORDER BY rb.block_order
+    """, (report_id,))
+    
+    blocks = []
+    for block_row in cursor.fetchall():
+        block_id = block_row[0]
         
-        db.commit()
-        return True
+        # Get tags for this block
+        cursor.execute("""
+            SELECT tag FROM block_tags WHERE block_id = ?
+        """, (block_id,))
+        tags = [tag[0] for tag in cursor.fetchall()]
         
-    except Exception as e:
-        db.rollback()
-        raise e
+        blocks.append(ReportBlock(
+            id=block_id,
+            content=decode_content(block_row[4], block_row[1], cursor),
+            type=block_row[2],
+            tags=tags
+        ))
+    
+    return blocks
+
+def _report_from_row(report_row, cursor) -> ReportDocument:
+    return ReportDocument(
+        id=report_row[0],
+        title=report_row[1],
+        file_path=report_row[2],
+        file_size=report_row[3],
+        file_type=report_row[4],
+        created_at=report_row[5],
+        updated_at=report_row[6],
+        blocks=get_report_blocks(report_row[0], cursor)
+    )
 
 def get_reports_by_user(user_id: int, db) -> List[ReportDocument]:
     """Get all reports for a user"""
@@ -98,55 +410,350 @@ def get_reports_by_user(user_id: int, db) -> List[ReportDocument]:
     cursor.execute("""
         SELECT id, title, file_path, file_size, file_type, created_at, updated_at
         FROM reports WHERE user_id = ?
-        ORDER BY created_at DESC
+        ORDER BY created_at DESC, rowid DESC
     """, (user_id,))
     
-    reports = []
-    for report_row in cursor.fetchall():
-        report_id = report_row[0]
+    return [_report_from_row(report_row, cursor) for report_row in cursor.fetchall()]
+
+def get_report_by_id(report_id: str, user_id: int, db) -> Optional[ReportDocument]:
+    """Get a single report owned by a user"""
+    cursor = db.cursor()
+    
+    cursor.execute("""
+        SELECT id, title, file_path, file_size, file_type, created_at, updated_at
+        FROM reports WHERE id = ? AND user_id = ?
+    """, (report_id, user_id))
+    
+    report_row = cursor.fetchone()
+    if not report_row:
+        return None
+    
+    return _report_from_row(report_row, cursor)
+
+def get_report_file(report_id: str, user_id: int, db) -> Optional[dict]:
+    """Get the stored original file of a report, without loading its blocks"""
+    cursor = db.cursor()
+    
+    cursor.execute("""
+        SELECT title, file_path, file_type FROM reports WHERE id = ? AND user_id = ?
+    """, (report_id, user_id))
+    
+    row = cursor.fetchone()
+    if not row:
+        return None
+    
+    return {"title": row[0], "file_path": row[1], "file_type": row[2]}
+
+def get_report_facts(report_id: str, user_id: int, db) -> Optional[List[Tuple[str, float, float]]]:
+    """Get (tag, value, half unit) for each tag on a numeric block of a report"""
+    cursor = db.cursor()
+    
+    cursor.execute("SELECT 1 FROM reports WHERE id = ? AND user_id = ?", (report_id, user_id))
+    if not cursor.fetchone():
+        return None
+    
+    # Content is only read for blocks stored before numbers were parsed on write
+    cursor.execute("""
+        SELECT bt.tag, rb.numeric_value, rb.numeric_half_unit,
+               CASE WHEN rb.numeric_half_unit IS NULL THEN rb.content END, rb.content_codec
+        FROM report_blocks rb
+        JOIN block_tags bt ON bt.block_id = rb.id
+        WHERE rb.report_id = ? AND (rb.numeric_value IS NOT NULL OR rb.numeric_half_unit IS NULL)
+    """, (report_id,))
+    rows = cursor.fetchall()
+    
+    facts = []
+    for tag, value, half_unit, content, codec in rows:
+        if half_unit is None:
+            number = parse_number(decode_content(codec, content, cursor))
+            if number is None:
+                continue
+            value, half_unit = number
+        facts.append((tag, value, half_unit))
+    return facts
+
+def _export_block(row, cursor) -> dict:
+    return {
+        "id": row[7],
+        "content": decode_content(row[10], row[8], cursor),
+        "type": row[9],
+        "tags": json.loads(row[11]),
+    }
+
+def iter_report_export(user_id: int, per_block: bool = False) -> Iterator[dict]:
+    """Yield a user's reports as plain dicts, or one dict per block with per_block.
+
+    A single query walks reports and their blocks in order, so at most one
+    report is held in memory and no models are built.
+    """
+    # Streaming responses advance the generator from different threadpool threads
+    conn = connect(DATABASE_URL, check_same_thread=False)
+    try:
+        cursor = conn.cursor()
+        # decode_content may look up compression dictionaries, keep that off the streaming cursor
+        lookups = conn.cursor()
         
-        # Get blocks for this report
         cursor.execute("""
-            SELECT rb.id, rb.content, rb.type, rb.block_order
-            FROM report_blocks rb
-            WHERE rb.report_id = ?
-            ORDER BY rb.block_order
-        """, (report_id,))
+            SELECT r.id, r.title, r.created_at, r.updated_at, r.file_path, r.file_size, r.file_type,
+                   rb.id, rb.content, rb.type, rb.content_codec,
+                   (SELECT json_group_array(tag) FROM block_tags WHERE block_id = rb.id)
+            FROM reports r
+            LEFT JOIN report_blocks rb ON rb.report_id = r.id
+            WHERE r.user_id = ?
+            ORDER BY r.created_at DESC, r.rowid DESC, rb.block_order
+        """, (user_id,))
         
-        blocks = []
-        for block_row in cursor.fetchall():
-            block_id = block_row[0]
+        for report_id, rows in groupby(cursor, key=lambda row: row[0]):
+            first = next(rows)
+            # A report without blocks comes back as one row of NULL block columns
+            blocks = (_export_block(row, lookups) for row in chain((first,), rows) if row[7] is not None)
             
-            # Get tags for this block
-            cursor.execute("""
-                SELECT tag FROM block_tags WHERE block_id = ?
-            """, (block_id,))
-            tags = [tag[0] for tag in cursor.fetchall()]
+            if per_block:
+                for block in blocks:
+                    yield {"report_id": report_id, **block}
+                continue
             
-            blocks.append(ReportBlock(
-                id=block_id,
-                content=block_row[1],
-                type=block_row[2],
-                tags=tags
-            ))
+            yield {
+                "id": report_id,
+                "title": first[1],
+                "created_at": first[2],
+                "updated_at": first[3],
+                "blocks": list(blocks),
+                "file_path": first[4],
+                "file_size": first[5],
+                "file_type": first[6],
+            }
+    finally:
+        conn.close()
+
+def record_report_version(report_id: str, previous: Optional[dict], blocks: List[ReportBlock], title: str, cursor,
+                          created_at: Optional[str] = None) -> int:
+    """Store the next version of a report as a checkpoint or a delta against `previous`.
+
+    `previous` maps block id to (block_order, ReportBlock) for the prior version,
+    None forces a full checkpoint. `created_at` defaults to now.
+    """
+    cursor.execute("SELECT MAX(version) FROM report_versions WHERE report_id = ?", (report_id,))
+    version = (cursor.fetchone()[0] or 0) + 1
+    is_checkpoint = previous is None or (version - 1) % VERSION_CHECKPOINT_INTERVAL == 0
+    
+    rows = []
+    for order, block in enumerate(blocks):
+        old = None if is_checkpoint else previous.get(block.id)
+        if old is None or old[1].content != block.content:
+            codec, content = encode_content(block.content, cursor)
+            rows.append((report_id, version, block.id, "put", order, block.type, content, codec, json.dumps(block.tags)))
+        elif (old[0], old[1].type, old[1].tags) != (order, block.type, block.tags):
+            rows.append((report_id, version, block.id, "meta", order, block.type, None, None, json.dumps(block.tags)))
+    
+    if not is_checkpoint:
+        current_ids = {block.id for block in blocks}
+        rows.extend(
+            (report_id, version, block_id, "delete", None, None, None, None, None)
+            for block_id in previous if block_id not in current_ids
+        )
+    
+    cursor.execute("""
+        INSERT INTO report_versions (report_id, version, title, is_checkpoint, changed_blocks, created_at)
+        VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+    """, (report_id, version, title, is_checkpoint, len(rows), created_at))
+    
+    cursor.executemany("""
+        INSERT INTO report_version_blocks
+        (report_id, version, block_id, operation, block_order, type, content, content_codec, tags)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    
+    return version
+
+def update_report(report_id: str, update: ReportUpdate, user_id: int, db) -> Optional[ReportDocument]:
+    """Replace a report's title and blocks, recording the change as a new version"""
+    if not execute_write(_update_report, report_id, update, user_id):
+        return None
+    
+    return get_report_by_id(report_id, user_id, db)
+
+def _update_report(cursor, report_id: str, update: ReportUpdate, user_id: int) -> bool:
+    cursor.execute("SELECT title, created_at FROM reports WHERE id = ? AND user_id = ?", (report_id, user_id))
+    row = cursor.fetchone()
+    if not row:
+        return False
+    
+    previous_blocks = get_report_blocks(report_id, cursor)
+    previous = {block.id: (order, block) for order, block in enumerate(previous_blocks)}
+    
+    # Block ids are primary keys across all reports, a new one must not belong to another report
+    added = [block.id for block in update.blocks if block.id not in previous]
+    for batch in batched(added, BLOCK_INSERT_BATCH_SIZE):
+        placeholders = ", ".join("?" * len(batch))
+        cursor.execute(f"SELECT id FROM report_blocks WHERE id IN ({placeholders}) LIMIT 1", batch)
+        taken = cursor.fetchone()
+        if taken:
+            raise BlockIdConflict(f"Block id {taken[0]} is already used by another report")
+    
+    # Reports without history get their state as uploaded as the first checkpoint
+    cursor.execute("SELECT 1 FROM report_versions WHERE report_id = ? LIMIT 1", (report_id,))
+    if not cursor.fetchone():
+        record_report_version(report_id, None, previous_blocks, row[0], cursor, created_at=row[1])
+    
+    # Remove blocks that are gone
+    new_ids = {block.id for block in update.blocks}
+    removed = [block_id for block_id in previous if block_id not in new_ids]
+    for batch in batched(removed, BLOCK_INSERT_BATCH_SIZE):
+        placeholders = ", ".join("?" * len(batch))
+        unindex_blocks(batch, cursor)
+        cursor.execute(f"DELETE FROM block_tags WHERE block_id IN ({placeholders})", batch)
+        cursor.execute(f"DELETE FROM report_blocks WHERE id IN ({placeholders})", batch)
+    
+    for order, block in enumerate(update.blocks):
+        old = previous.get(block.id)
+        if old is None:
+            insert_report_blocks(report_id, [block], order, user_id, cursor)
+            continue
         
-        reports.append(ReportDocument(
-            id=report_id,
-            title=report_row[1],
-            file_path=report_row[2],
-            file_size=report_row[3],
-            file_type=report_row[4],
-            created_at=report_row[5],
-            updated_at=report_row[6],
-            blocks=blocks
-        ))
+        old_order, old_block = old
+        content_changed = old_block.content != block.content
+        tags_changed = old_block.tags != block.tags
+        
+        if content_changed:
+            codec, content = encode_content(block.content, cursor)
+            cursor.execute("""
+                UPDATE report_blocks
+                SET content = ?, content_codec = ?, type = ?, block_order = ?, numeric_value = ?, numeric_half_unit = ?
+                WHERE id = ?
+            """, (content, codec, block.type, order, *block_number(block.content), block.id))
+        elif old_block.type != block.type or old_order != order:
+            cursor.execute("""
+                UPDATE report_blocks SET type = ?, block_order = ? WHERE id = ?
+            """, (block.type, order, block.id))
+        
+        if tags_changed:
+            cursor.execute("DELETE FROM block_tags WHERE block_id = ?", (block.id,))
+            cursor.executemany("""
+                INSERT INTO block_tags (block_id, tag)
+                VALUES (?, ?)
+            """, [(block.id, tag) for tag in block.tags])
+        
+        # Newly tagged or edited blocks become (or stop being) tag donors
+        if content_changed or tags_changed:
+            unindex_blocks([block.id], cursor)
+            signature = compute_signature(block.content) if block.tags else []
+            if signature:
+                index_block_signature(block.id, signature, user_id, cursor)
+    
+    title = update.title or row[0]
+    cursor.execute("""
+        UPDATE reports SET title = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+    """, (title, report_id))
+    
+    record_report_version(report_id, previous, update.blocks, title, cursor)
     
-    return reports
+    return True
 
-def delete_report(report_id: str, user_id: int, db) -> Optional[str]:
-    """Delete a report and return file path if exists"""
+def get_report_versions(report_id: str, user_id: int, db) -> Optional[List[ReportVersion]]:
+    """List the versions of a report, newest first"""
     cursor = db.cursor()
     
+    cursor.execute("""
+        SELECT title, created_at FROM reports WHERE id = ? AND user_id = ?
+    """, (report_id, user_id))
+    report_row = cursor.fetchone()
+    if not report_row:
+        return None
+    
+    cursor.execute("""
+        SELECT version, title, is_checkpoint, changed_blocks, created_at
+        FROM report_versions WHERE report_id = ?
+        ORDER BY version DESC
+    """, (report_id,))
+    rows = cursor.fetchall()
+    
+    # A report that was never edited is its own first version
+    if not rows:
+        cursor.execute("SELECT COUNT(*) FROM report_blocks WHERE report_id = ?", (report_id,))
+        rows = [(1, report_row[0], True, cursor.fetchone()[0], report_row[1])]
+    
+    return [
+        ReportVersion(
+            version=row[0],
+            title=row[1],
+            is_checkpoint=bool(row[2]),
+            changed_blocks=row[3],
+            created_at=row[4]
+        ) for row in rows
+    ]
+
+def get_report_version(report_id: str, version: int, user_id: int, db) -> Optional[ReportDocument]:
+    """Rebuild a report version from its nearest checkpoint and the deltas after it"""
+    cursor = db.cursor()
+    
+    cursor.execute("""
+        SELECT id, title, file_path, file_size, file_type, created_at, updated_at
+        FROM reports WHERE id = ? AND user_id = ?
+    """, (report_id, user_id))
+    report_row = cursor.fetchone()
+    if not report_row:
+        return None
+    
+    cursor.execute("""
+        SELECT title, created_at FROM report_versions WHERE report_id = ? AND version = ?
+    """, (report_id, version))
+    version_row = cursor.fetchone()
+    if not version_row:
+        cursor.execute("SELECT 1 FROM report_versions WHERE report_id = ? LIMIT 1", (report_id,))
+        if version == 1 and not cursor.fetchone():
+            return _report_from_row(report_row, cursor)
+        return None
+    
+    cursor.execute("""
+        SELECT MAX(version) FROM report_versions
+        WHERE report_id = ? AND version <= ? AND is_checkpoint
+    """, (report_id, version))
+    checkpoint = cursor.fetchone()[0]
+    
+    # At most VERSION_CHECKPOINT_INTERVAL versions are replayed
+    cursor.execute("""
+        SELECT block_id, operation, block_order, type, content, content_codec, tags
+        FROM report_version_blocks
+        WHERE report_id = ? AND version BETWEEN ? AND ?
+        ORDER BY version
+    """, (report_id, checkpoint, version))
+    
+    state = {}
+    for block_id, operation, block_order, block_type, content, codec, tags in cursor.fetchall():
+        if operation == "delete":
+            state.pop(block_id, None)
+        elif operation == "put":
+            state[block_id] = [block_order, block_type, content, codec, tags]
+        else:
+            state[block_id][0:2] = [block_order, block_type]
+            state[block_id][4] = tags
+    
+    blocks = [
+        ReportBlock(
+            id=block_id,
+            content=decode_content(codec, content, cursor),
+            type=block_type,
+            tags=json.loads(tags)
+        ) for block_id, (_, block_type, content, codec, tags) in sorted(state.items(), key=lambda item: item[1][0])
+    ]
+    
+    return ReportDocument(
+        id=report_row[0],
+        title=version_row[0],
+        file_path=report_row[2],
+        file_size=report_row[3],
+        file_type=report_row[4],
+        created_at=report_row[5],
+        updated_at=version_row[1],
+        blocks=blocks
+    )
+
+def delete_report(report_id: str, user_id: int, db) -> Optional[dict]:
+    """Delete a report, returns None if it does not exist, else its stored file path"""
+    return execute_write(_delete_report, report_id, user_id)
+
+def _delete_report(cursor, report_id: str, user_id: int) -> Optional[dict]:
     # Check if report exists and belongs to user
     cursor.execute("""
         SELECT file_path FROM reports 
@@ -160,18 +767,23 @@ def delete_report(report_id: str, user_id: int, db) -> Optional[str]:
     file_path = result[0]
     
     # Delete from database
+    cursor.execute("SELECT id FROM report_blocks WHERE report_id = ?", (report_id,))
+    for batch in batched((row[0] for row in cursor.fetchall()), BLOCK_INSERT_BATCH_SIZE):
+        unindex_blocks(batch, cursor)
+    cursor.execute("DELETE FROM report_version_blocks WHERE report_id = ?", (report_id,))
+    cursor.execute("DELETE FROM report_versions WHERE report_id = ?", (report_id,))
     cursor.execute("DELETE FROM block_tags WHERE block_id IN (SELECT id FROM report_blocks WHERE report_id = ?)", (report_id,))
     cursor.execute("DELETE FROM report_blocks WHERE report_id = ?", (report_id,))
     cursor.execute("DELETE FROM reports WHERE id = ?", (report_id,))
     
-    db.commit()
-    return file_path
+    return {"file_path": file_path}
 
-# Call this in your main init_db function
 def init_db():
-    # Your existing init_db code here
-    # ...
+    # WAL keeps reads concurrent with the writer queue, the mode is stored in the database file
+    conn = connect(DATABASE_URL)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
     
-    # Add this line to initialize reports tables
+    init_users_db()
     init_reports_db()
 
@@ -1,12 +1,22 @@
 # File: main.py
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime, timedelta
+import asyncio
+import os
 from typing import Optional, List
 
 # Import from your existing modules
-from core.config import ALLOWED_ORIGINS , ALLOWED_EXTENSIONS ,ACCESS_TOKEN_EXPIRE_MINUTES,ALGORITHM,DATABASE_URL, REFRESH_TOKEN_EXPIRE_DAYS, SECRET_KEY
+from core.config import ALLOWED_ORIGINS , ALLOWED_EXTENSIONS ,ACCESS_TOKEN_EXPIRE_MINUTES,ALGORITHM,DATABASE_URL, METRICS_PUBLIC, REFRESH_TOKEN_EXPIRE_DAYS, SECRET_KEY, UPLOAD_DIRECTORY, UPLOAD_GC_INTERVAL_SECONDS
 from database import get_db, init_db
+from core.write_queue import stop_write_queue
+from core.upload_cleanup import run_periodic_gc, stop_file_reaper
+from core.metrics import MetricsMiddleware, render_metrics
+from core.profiling import ProfilingMiddleware
+from core.admission import IngestAdmissionMiddleware
 from model import User, UserCreate, UserLogin, Token, RefreshToken
 from auth import (
     get_current_user, 
@@ -21,8 +31,26 @@ from auth import (
     revoke_refresh_token
 )
 
+# Startup work runs here rather than at import time, so importing the app stays cheap
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+    gc_task = asyncio.create_task(run_periodic_gc()) if UPLOAD_GC_INTERVAL_SECONDS else None
+    yield
+    if gc_task:
+        gc_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await gc_task
+    # Commit writes and remove files still queued before the worker exits
+    stop_write_queue()
+    stop_file_reaper()
+
 # Initialize FastAPI app
-app = FastAPI(title="Authentication API with File Upload", version="1.0.0")
+app = FastAPI(title="Authentication API with File Upload", version="1.0.0", lifespan=lifespan)
+
+# Per-user ingest limits, checked before the upload body is received
+app.add_middleware(IngestAdmissionMiddleware, paths={"/api/files/upload", "/api/files/upload-text"})
 
 # CORS middleware for Next.js frontend
 app.add_middleware(
@@ -33,8 +61,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database
-init_db()
+# cProfile capture of single requests for admins sending X-Profile
+app.add_middleware(ProfilingMiddleware)
+
+# Request latency per route, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
 
 # API Routes
 @app.post("/register", response_model=dict)
@@ -48,7 +79,7 @@ async def register(user: UserCreate, db = Depends(get_db)):
         )
     
     # Create user
-    created_user = create_user(user, db)
+    created_user = await run_in_threadpool(create_user, user, db)
     if not created_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -69,7 +100,6 @@ async def register(user: UserCreate, db = Depends(get_db)):
 async def login(user_credentials: UserLogin, db = Depends(get_db)):
     user = authenticate_user(user_credentials.email, user_credentials.password, db)
     
-    print("user", user)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -96,7 +126,8 @@ async def login(user_credentials: UserLogin, db = Depends(get_db)):
     )
     
     # Store refresh token
-    store_refresh_token(
+    await run_in_threadpool(
+    store_refresh_token,
     user.id, 
     refresh_token, 
     datetime.utcnow() + refresh_token_expires
@@ -128,7 +159,7 @@ async def refresh_token(refresh_data: RefreshToken, db = Depends(get_db)):
         )
     
     # Verify refresh token exists in database
-    user_id = verify_refresh_token(refresh_data.refresh_token, db)
+    user_id = await run_in_threadpool(verify_refresh_token, refresh_data.refresh_token)
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -146,7 +177,7 @@ async def refresh_token(refresh_data: RefreshToken, db = Depends(get_db)):
     # Create new access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     new_access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user["email"]}, expires_delta=access_token_expires
     )
     
     return {
@@ -157,7 +188,7 @@ async def refresh_token(refresh_data: RefreshToken, db = Depends(get_db)):
 @app.post("/logout")
 async def logout(refresh_data: RefreshToken, db = Depends(get_db)):
     # Revoke refresh token
-    revoke_refresh_token(refresh_data.refresh_token, db)
+    await run_in_threadpool(revoke_refresh_token, refresh_data.refresh_token)
     return {"message": "Logged out successfully"}
 
 @app.get("/me", response_model=User)
@@ -180,6 +211,11 @@ async def get_all_users(
     from database import get_all_users
     return get_all_users(db)
 
+@app.get("/metrics", include_in_schema=False, dependencies=[] if METRICS_PUBLIC else [Depends(require_role("admin"))])
+async def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 @app.get("/")
 async def root():
     return {"message": "Authentication API with File Upload is running"}
@@ -188,6 +224,9 @@ async def root():
 from routes.file_upload_routes import router as file_router
 app.include_router(file_router)
 
+from routes.admin_routes import router as admin_router
+app.include_router(admin_router)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
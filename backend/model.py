@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 
 class UserCreate(BaseModel):
@@ -45,6 +45,50 @@ class ReportDocument(BaseModel):
     file_size: Optional[int] = None
     file_type: Optional[str] = None
 
+class ReportUpdate(BaseModel):
+    title: Optional[str] = None
+    blocks: List[ReportBlock]
+
+class ReportVersion(BaseModel):
+    version: int
+    title: str
+    is_checkpoint: bool
+    changed_blocks: int
+    created_at: str
+
 class TextUpload(BaseModel):
     text: str
-    title: Optional[str] = "Pasted Report"
\ No newline at end of file
+    title: Optional[str] = "Pasted Report"
+
+class CalculationArc(BaseModel):
+    total: str = Field(alias="from")
+    item: str = Field(alias="to")
+    weight: float
+    order: Optional[str] = None
+
+class CalculationCheck(BaseModel):
+    calculations: Optional[List[CalculationArc]] = None
+
+class CalculationItem(BaseModel):
+    concept: str
+    weight: float
+    value: Optional[float] = None
+
+class CalculationInconsistency(BaseModel):
+    concept: str
+    reported: float
+    computed: float
+    difference: float
+    tolerance: float
+    items: List[CalculationItem]
+
+class DuplicateFact(BaseModel):
+    concept: str
+    values: List[float]
+
+class CalculationValidation(BaseModel):
+    facts: int
+    summations: int
+    checked: int
+    inconsistencies: List[CalculationInconsistency]
+    duplicates: List[DuplicateFact]
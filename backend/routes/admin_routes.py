@@ -0,0 +1,44 @@
+# File: routes/admin_routes.py
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from auth import require_role
+from core.profiling import list_profiles, profile_path, profile_summary
+from core.upload_cleanup import collect_orphaned_uploads
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+@router.get("/profiles")
+async def get_profiles(current_user: dict = Depends(require_role("admin"))):
+    """List stored request profiles, newest first"""
+    return list_profiles()
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = "prof",
+    current_user: dict = Depends(require_role("admin"))
+):
+    """Download a profile as a pstats file, or as a text summary with ?format=text"""
+    path = profile_path(profile_id)
+
+    if path is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Profile not found"
+        )
+
+    if format == "text":
+        return PlainTextResponse(profile_summary(path))
+
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+@router.post("/uploads/gc")
+async def collect_uploads(
+    dry_run: bool = False,
+    force: bool = False,
+    current_user: dict = Depends(require_role("admin"))
+):
+    """Remove uploaded files no report references, reports the bytes reclaimed"""
+    return await run_in_threadpool(collect_orphaned_uploads, dry_run=dry_run, force=force)
@@ -1,34 +1,41 @@
 
 # File: routes/file_upload_routes.py
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
-from fastapi.responses import JSONResponse
-from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import BinaryIO, Iterable, Iterator, List, Optional
 import os
+import shutil
 import uuid
 from datetime import datetime
-import PyPDF2
-import docx
-from io import BytesIO
+from itertools import chain
 import mimetypes
 from pathlib import Path
 
 # Import from your existing modules
-# from core.config import settings
+from core.config import UPLOAD_DIRECTORY, MAX_FILE_SIZE, ALLOWED_EXTENSIONS
 from database import get_db
-from model import ReportBlock, ReportDocument, TextUpload
+from model import (
+    ReportBlock,
+    ReportDocument,
+    ReportUpdate,
+    ReportVersion,
+    TextUpload,
+    CalculationCheck,
+    CalculationValidation,
+)
 from auth import get_current_user
+from core.segmenter import segment_lines, iter_text_lines
+from core.metrics import observe_stage, StageTimer, BYTES_INGESTED, BLOCKS_CREATED
+from core.admission import ingest_admission
+from core.profiling import profile_call
+from core.file_response import RangeFileResponse
+from core.upload_cleanup import schedule_file_removal
+from core.export import ndjson_chunks, NDJSON_MEDIA_TYPE
 
 # Create router
 router = APIRouter(prefix="/api/files", tags=["files"])
 
-# Configuration
-UPLOAD_DIRECTORY = "uploads"
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-ALLOWED_EXTENSIONS = {".pdf", ".docx", ".doc"}
-
-# Create upload directory if it doesn't exist
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
-
 # Utility functions
 def generate_unique_id():
     return str(uuid.uuid4())
@@ -44,58 +51,91 @@ def validate_file(file: UploadFile) -> bool:
     
     return True
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF file"""
+def save_upload(source: BinaryIO, file_path: str):
+    """Copy an upload to disk in chunks and rewind it for extraction"""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(source, f)
+    source.seek(0)
+
+def iter_lines_from_pdf(file: BinaryIO) -> Iterator[str]:
+    """Stream text lines from a PDF file, one page at a time"""
+    import PyPDF2  # imported on first use to keep worker startup fast
+    
     try:
-        pdf_file = BytesIO(file_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
+        pdf_reader = PyPDF2.PdfReader(file)
         
         for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        
-        return text.strip()
+            yield from iter_text_lines(page.extract_text() or "")
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Error extracting text from PDF: {str(e)}"
         )
 
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX file"""
+def iter_lines_from_docx(file: BinaryIO) -> Iterator[str]:
+    """Stream text from a DOCX file, one paragraph per block boundary"""
+    import docx  # imported on first use to keep worker startup fast
+    
     try:
-        doc_file = BytesIO(file_content)
-        doc = docx.Document(doc_file)
-        text = ""
+        doc = docx.Document(file)
         
         for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        
-        return text.strip()
+            yield paragraph.text
+            yield ""
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Error extracting text from DOCX: {str(e)}"
         )
 
-def extract_text_from_file(file_content: bytes, file_type: str) -> str:
-    """Extract text based on file type"""
+def iter_lines_from_file(file: BinaryIO, file_type: str) -> Iterator[str]:
+    """Stream text lines based on file type"""
     if file_type == "application/pdf":
-        return extract_text_from_pdf(file_content)
+        return iter_lines_from_pdf(file)
     elif file_type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", 
                        "application/msword"]:
-        return extract_text_from_docx(file_content)
+        return iter_lines_from_docx(file)
     else:
         raise HTTPException(
             status_code=400,
             detail="Unsupported file type"
         )
 
-def save_report_to_db(report: ReportDocument, user_id: int, db) -> bool:
-    """Save report to database"""
+def iter_blocks(lines: Iterable[str]) -> Iterator[ReportBlock]:
+    """Segment a line stream into typed report blocks"""
+    for block_type, content in segment_lines(lines):
+        yield ReportBlock(
+            id=generate_unique_id(),
+            content=content,
+            type=block_type,
+            tags=[]
+        )
+
+def ingest_report(report: ReportDocument, lines: Iterable[str], user_id: int, db) -> bool:
+    """Extract, segment and persist a report as one stream, False if it held no text"""
+    extract_timer, segment_timer = StageTimer(), StageTimer()
+    blocks = segment_timer.wrap(iter_blocks(extract_timer.wrap(lines)))
+    # The three stages run interleaved, each one's time excludes the stage feeding it
+    with observe_stage("persist", exclude=segment_timer):
+        saved = save_report_to_db(report, user_id, db, blocks)
+    segment_timer.observe("segment", exclude=extract_timer)
+    extract_timer.observe("extract")
+    return saved
+
+async def admit_ingest(request: Request, current_user: dict = Depends(get_current_user)):
+    """Hold an extraction slot for the request, or reject it with 503 and Retry-After"""
+    # Per-user limits already ran in IngestAdmissionMiddleware, before the body was read
+    ticket = getattr(request.state, "ingest_ticket", None)
+    async with ingest_admission.extraction_slot(ticket):
+        yield
+
+def save_report_to_db(report: ReportDocument, user_id: int, db, blocks: Optional[Iterable[ReportBlock]] = None) -> bool:
+    """Save report to database, streaming `blocks` into it when given"""
     try:
         from database import create_report
-        return create_report(report, user_id, db)
+        return create_report(report, user_id, db, blocks)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -113,8 +153,71 @@ def get_user_reports(user_id: int, db) -> List[ReportDocument]:
             detail=f"Error fetching reports: {str(e)}"
         )
 
-def delete_report_from_db(report_id: str, user_id: int, db) -> Optional[str]:
-    """Delete a report from database and return file path if exists"""
+def get_user_report(report_id: str, user_id: int, db) -> Optional[ReportDocument]:
+    """Get a single report for a user"""
+    try:
+        from database import get_report_by_id
+        return get_report_by_id(report_id, user_id, db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching report: {str(e)}"
+        )
+
+def get_user_report_file(report_id: str, user_id: int, db) -> Optional[dict]:
+    """Get the stored original file of a user's report"""
+    try:
+        from database import get_report_file
+        return get_report_file(report_id, user_id, db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching report file: {str(e)}"
+        )
+
+def export_user_reports(user_id: int, per_block: bool) -> Iterator[bytes]:
+    """Stream a user's reports as NDJSON chunks"""
+    from database import iter_report_export
+    return ndjson_chunks(iter_report_export(user_id, per_block), "block" if per_block else "report")
+
+def validate_user_report(report_id: str, check: Optional[CalculationCheck], user_id: int, db) -> Optional[dict]:
+    """Check the calculation network against a user's report, None if it does not exist"""
+    try:
+        from database import get_report_facts
+        from core.calculations import validate_calculations
+        facts = get_report_facts(report_id, user_id, db)
+        if facts is None:
+            return None
+        arcs = None
+        # An explicit empty list is an empty network, only a missing one falls back to the defaults
+        if check and check.calculations is not None:
+            arcs = [(arc.total, arc.item, arc.weight) for arc in check.calculations]
+        return validate_calculations(facts, arcs)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error validating report: {str(e)}"
+        )
+
+def update_user_report(report_id: str, update: ReportUpdate, user_id: int, db) -> Optional[ReportDocument]:
+    """Update a report and record a new version"""
+    from database import BlockIdConflict
+    try:
+        from database import update_report
+        return update_report(report_id, update, user_id, db)
+    except BlockIdConflict as e:
+        raise HTTPException(
+            status_code=409,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error updating report: {str(e)}"
+        )
+
+def delete_report_from_db(report_id: str, user_id: int, db) -> Optional[dict]:
+    """Delete a report from database, returns None if it does not exist"""
     try:
         from database import delete_report
         return delete_report(report_id, user_id, db)
@@ -125,7 +228,7 @@ def delete_report_from_db(report_id: str, user_id: int, db) -> Optional[str]:
         )
 
 # API Routes
-@router.post("/upload", response_model=ReportDocument)
+@router.post("/upload", response_model=ReportDocument, dependencies=[Depends(admit_ingest)])
 async def upload_file(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user),
@@ -141,54 +244,48 @@ async def upload_file(
         )
     
     try:
-        # Read file content
-        file_content = await file.read()
+        BYTES_INGESTED.labels("file").inc(file.size)
         
-        # Get file type
+        # Get file type, unsupported types are rejected before anything is written
         file_type = mimetypes.guess_type(file.filename)[0]
+        lines = iter_lines_from_file(file.file, file_type)
         
-        # Extract text from file
-        extracted_text = extract_text_from_file(file_content, file_type)
-        
-        if not extracted_text.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="No text could be extracted from the file"
-            )
-        
-        # Save file to disk
+        # Save file to disk, copied from the spooled upload instead of read into memory
         file_id = generate_unique_id()
         file_extension = Path(file.filename).suffix
         saved_filename = f"{file_id}{file_extension}"
         file_path = os.path.join(UPLOAD_DIRECTORY, saved_filename)
         
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        with observe_stage("write_file"):
+            await run_in_threadpool(save_upload, file.file, file_path)
         
-        # Split text into paragraphs
-        paragraphs = [p.strip() for p in extracted_text.split('\n\n') if p.strip()]
-        
-        # Create report document
+        # Create report document, its blocks are filled in as they are saved
         report = ReportDocument(
             id=generate_unique_id(),
             title=Path(file.filename).stem,
             created_at=datetime.now().isoformat(),
             updated_at=datetime.now().isoformat(),
             file_path=file_path,
-            file_size=len(file_content),
+            file_size=file.size,
             file_type=file_type,
-            blocks=[
-                ReportBlock(
-                    id=generate_unique_id(),
-                    content=paragraph,
-                    type="paragraph",
-                    tags=[]
-                ) for paragraph in paragraphs
-            ]
+            blocks=[]
         )
         
-        # Save to database
-        save_report_to_db(report, current_user["id"], db)
+        try:
+            # Extraction and writes run off the event loop, writes wait on the writer queue
+            saved = await run_in_threadpool(profile_call, ingest_report, report, lines, current_user["id"], db)
+        except Exception:
+            # Don't leave an unreferenced upload behind
+            schedule_file_removal(file_path)
+            raise
+        
+        if not saved:
+            schedule_file_removal(file_path)
+            raise HTTPException(
+                status_code=400,
+                detail="No text could be extracted from the file"
+            )
+        BLOCKS_CREATED.labels("file").inc(len(report.blocks))
         
         return report
         
@@ -200,7 +297,7 @@ async def upload_file(
             detail=f"Error processing file: {str(e)}"
         )
 
-@router.post("/upload-text", response_model=ReportDocument)
+@router.post("/upload-text", response_model=ReportDocument, dependencies=[Depends(admit_ingest)])
 async def upload_text(
     text_data: TextUpload,
     current_user: dict = Depends(get_current_user),
@@ -214,37 +311,65 @@ async def upload_text(
             detail="Text content cannot be empty"
         )
     
+    BYTES_INGESTED.labels("text").inc(len(text_data.text.encode("utf-8")))
+    
     try:
-        # Split text into paragraphs
-        paragraphs = [p.strip() for p in text_data.text.split('\n\n') if p.strip()]
-        
-        # Create report document
+        # Create report document, its blocks are filled in as they are saved
         report = ReportDocument(
             id=generate_unique_id(),
             title=text_data.title,
             created_at=datetime.now().isoformat(),
             updated_at=datetime.now().isoformat(),
-            blocks=[
-                ReportBlock(
-                    id=generate_unique_id(),
-                    content=paragraph,
-                    type="paragraph",
-                    tags=[]
-                ) for paragraph in paragraphs
-            ]
+            blocks=[]
         )
         
-        # Save to database
-        save_report_to_db(report, current_user["id"], db)
+        # Segment and save to database off the event loop
+        saved = await run_in_threadpool(profile_call, ingest_report, report, iter_text_lines(text_data.text), current_user["id"], db)
+        if not saved:
+            raise HTTPException(
+                status_code=400,
+                detail="Text content cannot be empty"
+            )
+        BLOCKS_CREATED.labels("text").inc(len(report.blocks))
         
         return report
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing text: {str(e)}"
         )
 
+@router.get("/export")
+async def export_reports(
+    granularity: str = "report",
+    current_user: dict = Depends(get_current_user)
+):
+    """Export all of the user's reports as NDJSON, one report or one block per line"""
+    if granularity not in ("report", "block"):
+        raise HTTPException(
+            status_code=400,
+            detail="granularity must be 'report' or 'block'"
+        )
+    
+    chunks = export_user_reports(current_user["id"], granularity == "block")
+    try:
+        # Read the first chunk up front so a failing query is a 500, not a truncated stream
+        first = await run_in_threadpool(next, chunks, b"")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error exporting reports: {str(e)}"
+        )
+    
+    return StreamingResponse(
+        chain((first,), chunks),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{granularity}s.ndjson"'}
+    )
+
 @router.get("/reports", response_model=List[ReportDocument])
 async def get_reports(
     current_user: dict = Depends(get_current_user),
@@ -260,8 +385,63 @@ async def get_report(
     db = Depends(get_db)
 ):
     """Get a specific report"""
-    reports = get_user_reports(current_user["id"], db)
-    report = next((r for r in reports if r.id == report_id), None)
+    report = get_user_report(report_id, current_user["id"], db)
+    
+    if not report:
+        raise HTTPException(
+            status_code=404,
+            detail="Report not found"
+        )
+    
+    return report
+
+@router.api_route("/reports/{report_id}/file", methods=["GET", "HEAD"])
+async def download_report_file(
+    report_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Download the original uploaded file, supports Range and conditional requests"""
+    report_file = get_user_report_file(report_id, current_user["id"], db)
+    
+    if not report_file:
+        raise HTTPException(
+            status_code=404,
+            detail="Report not found"
+        )
+    
+    file_path = report_file["file_path"]
+    upload_root = os.path.realpath(UPLOAD_DIRECTORY)
+    if not file_path or not os.path.realpath(file_path).startswith(upload_root + os.sep) or not os.path.isfile(file_path):
+        raise HTTPException(
+            status_code=404,
+            detail="Original file not available for this report"
+        )
+    
+    return RangeFileResponse(
+        file_path,
+        request.headers,
+        media_type=report_file["file_type"],
+        filename=f"{report_file['title']}{Path(file_path).suffix}"
+    )
+
+@router.put("/reports/{report_id}", response_model=ReportDocument)
+async def update_report(
+    report_id: str,
+    update: ReportUpdate,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Replace a report's blocks, keeping the previous state as a version"""
+    block_ids = [block.id for block in update.blocks]
+    if len(set(block_ids)) != len(block_ids):
+        raise HTTPException(
+            status_code=400,
+            detail="Block ids must be unique within a report"
+        )
+    
+    report = await run_in_threadpool(update_user_report, report_id, update, current_user["id"], db)
     
     if not report:
         raise HTTPException(
@@ -271,6 +451,73 @@ async def get_report(
     
     return report
 
+@router.post("/reports/{report_id}/validate", response_model=CalculationValidation)
+async def validate_report(
+    report_id: str,
+    check: Optional[CalculationCheck] = None,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Check that tagged numeric facts add up along the calculation network"""
+    result = await run_in_threadpool(profile_call, validate_user_report, report_id, check, current_user["id"], db)
+    
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Report not found"
+        )
+    
+    return result
+
+@router.get("/reports/{report_id}/versions", response_model=List[ReportVersion])
+async def get_report_versions(
+    report_id: str,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """List the versions of a report"""
+    try:
+        from database import get_report_versions as list_versions
+        versions = list_versions(report_id, current_user["id"], db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching report versions: {str(e)}"
+        )
+    
+    if versions is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Report not found"
+        )
+    
+    return versions
+
+@router.get("/reports/{report_id}/versions/{version}", response_model=ReportDocument)
+async def get_report_version(
+    report_id: str,
+    version: int,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Get a report as it was at a given version"""
+    try:
+        from database import get_report_version as load_version
+        report = load_version(report_id, version, current_user["id"], db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching report version: {str(e)}"
+        )
+    
+    if not report:
+        raise HTTPException(
+            status_code=404,
+            detail="Report version not found"
+        )
+    
+    return report
+
 @router.delete("/reports/{report_id}")
 async def delete_report(
     report_id: str,
@@ -280,17 +527,16 @@ async def delete_report(
     """Delete a report"""
     
     # Delete from database and get file path
-    file_path = delete_report_from_db(report_id, current_user["id"], db)
+    deleted = await run_in_threadpool(delete_report_from_db, report_id, current_user["id"], db)
     
-    if file_path is None:
+    if deleted is None:
         raise HTTPException(
             status_code=404,
             detail="Report not found"
         )
     
-    # Delete file if it exists
-    if file_path and os.path.exists(file_path):
-        os.remove(file_path)
+    # The file is removed in the background once the delete is committed
+    schedule_file_removal(deleted["file_path"])
     
     return {"message": "Report deleted successfully"}
 
@@ -0,0 +1,65 @@
+# File: tests/conftest.py
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """App client with auth.db and uploads/ in a scratch directory"""
+    # DATABASE_URL and UPLOAD_DIRECTORY are relative, so they resolve inside tmp_path
+    monkeypatch.chdir(tmp_path)
+    from fastapi.testclient import TestClient
+    from core.admission import ingest_admission
+    from main import app
+
+    # User ids restart with every database, so must the admission quotas
+    monkeypatch.setattr(ingest_admission, "_users", {})
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def login(client):
+    """Register a user and return the token pair from /login"""
+    def login(email: str = "user@example.com", password: str = "test-password"):
+        client.post("/register", json={"email": email, "username": email.split("@")[0], "password": password})
+        response = client.post("/login", json={"email": email, "password": password})
+        assert response.status_code == 200
+        return response.json()
+    return login
+
+
+@pytest.fixture
+def admin_headers(client, login):
+    """Authorization header of a user promoted to the admin role"""
+    import sqlite3
+    from core.config import DATABASE_URL
+
+    tokens = login("admin@example.com")
+    db = sqlite3.connect(DATABASE_URL)
+    with db:
+        db.execute("UPDATE users SET role = 'admin' WHERE email = ?", ("admin@example.com",))
+    db.close()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def docx_bytes(*paragraphs: str) -> bytes:
+    """A .docx file holding the given paragraphs"""
+    from io import BytesIO
+    import docx
+
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    out = BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
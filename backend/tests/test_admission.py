@@ -0,0 +1,81 @@
+# File: tests/test_admission.py
+import json
+
+import pytest
+
+import core.admission
+
+
+@pytest.fixture
+def headers(client, login, monkeypatch):
+    """Credentials of a user whose byte bucket holds 4 KiB"""
+    monkeypatch.setattr(core.admission, "USER_BYTES_BURST", 4096)
+    return {"Authorization": f"Bearer {login()['access_token']}"}
+
+
+def text_upload(size: int) -> bytes:
+    return json.dumps({"title": "quota", "text": "Emissions were reported. " * (size // 25)}).encode()
+
+
+def test_chunked_body_is_charged_as_read(client, headers):
+    body = text_upload(8192)
+    # No Content-Length, the body arrives in chunks
+    chunks = (body[i:i + 1024] for i in range(0, len(body), 1024))
+    response = client.post("/api/files/upload-text", content=chunks,
+                           headers={**headers, "Content-Type": "application/json"})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_small_upload_is_admitted(client, headers):
+    response = client.post("/api/files/upload-text", content=text_upload(1024),
+                           headers={**headers, "Content-Type": "application/json"})
+    assert response.status_code == 200
+
+
+def test_declared_oversize_body_is_rejected_before_it_is_read(client, headers):
+    from main import app
+
+    received = []
+    messages = []
+
+    async def receive():
+        received.append(True)
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/files/upload-text", "raw_path": b"/api/files/upload-text",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/json"),
+            (b"content-length", b"1000000"),
+            (b"authorization", headers["Authorization"].encode()),
+        ],
+    }
+    client.portal.call(app, scope, receive, send)
+    assert messages[0]["status"] == 429
+    assert not received
+
+
+def test_token_is_resolved_once_per_request(client, admin_headers, monkeypatch):
+    import auth
+
+    lookups = []
+    get_user_by_email = auth.get_user_by_email
+
+    def counted(email, db):
+        lookups.append(email)
+        return get_user_by_email(email=email, db=db)
+
+    monkeypatch.setattr(auth, "get_user_by_email", counted)
+    # Profiling, admission and the route's dependency all need the user
+    response = client.post("/api/files/upload-text", json={"text": "Scope 1 emissions were 1,200 tCO2eq."},
+                           headers={**admin_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert "X-Profile-Id" in response.headers
+    assert lookups == ["admin@example.com"]
@@ -0,0 +1,23 @@
+# File: tests/test_auth.py
+
+
+def test_refresh_returns_new_access_token(client, login):
+    tokens = login()
+    response = client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    access_token = response.json()["access_token"]
+    me = client.get("/me", headers={"Authorization": f"Bearer {access_token}"})
+    assert me.status_code == 200
+    assert me.json()["email"] == "user@example.com"
+
+
+def test_refresh_rejects_revoked_token(client, login):
+    tokens = login()
+    assert client.post("/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 200
+    response = client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+
+def test_refresh_rejects_malformed_token(client):
+    response = client.post("/refresh", json={"refresh_token": "not-a-jwt"})
+    assert response.status_code == 401
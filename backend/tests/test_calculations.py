@@ -0,0 +1,23 @@
+# File: tests/test_calculations.py
+from core.calculations import validate_calculations
+
+SCOPE_1 = "esrs:GrossScope1GreenhouseGasEmissions"
+TOTAL = "esrs:TotalGHGEmissionsLocationBased"
+
+
+def test_missing_network_uses_defaults():
+    result = validate_calculations([(TOTAL, 10.0, 0.5), (SCOPE_1, 4.0, 0.5)])
+    assert result["checked"] == 1
+    assert result["inconsistencies"][0]["concept"] == "TotalGHGEmissionsLocationBased"
+
+
+def test_empty_network_checks_nothing():
+    result = validate_calculations([(TOTAL, 10.0, 0.5), (SCOPE_1, 4.0, 0.5)], [])
+    assert result == {"facts": 0, "summations": 0, "checked": 0, "inconsistencies": [], "duplicates": []}
+
+
+def test_duplicates_list_values_in_reported_order():
+    facts = [("a", 1.0, 0.5), ("b", 2.0, 0.5), ("a", 5.0, 0.5), ("c", 3.0, 0.5), ("a", 9.0, 0.5), ("b", 7.0, 0.5)]
+    result = validate_calculations(facts, [("c", "a", 1.0), ("c", "b", 1.0)])
+    assert result["checked"] == 0
+    assert result["duplicates"] == [{"concept": "a", "values": [1.0, 5.0, 9.0]}, {"concept": "b", "values": [2.0, 7.0]}]
@@ -0,0 +1,82 @@
+# File: tests/test_compression.py
+import sqlite3
+
+import pytest
+
+import core.compression as compression
+from core.config import DATABASE_URL
+
+
+@pytest.fixture
+def db(client, monkeypatch):
+    monkeypatch.setattr(compression, "BLOCK_COMPRESSION", "zstd")
+    monkeypatch.setattr(compression, "COMPRESSION_DICTIONARY_RECHECK_SECONDS", 0)
+    monkeypatch.setattr(compression, "_active_dictionary_expires", 0.0)
+    conn = sqlite3.connect(DATABASE_URL)
+    yield conn
+    conn.close()
+
+
+def test_size_threshold_counts_bytes_not_characters(db):
+    # 40 characters, 120 bytes in UTF-8
+    content = "€" * 40
+    codec, value = compression.encode_content(content, db.cursor())
+    assert codec == compression.ZSTD_CODEC
+    assert compression.decode_content(codec, value, db.cursor()) == content
+
+
+def test_dictionary_trained_elsewhere_is_picked_up(db):
+    content = "Gross Scope 1 greenhouse gas emissions were 1,200 tCO2eq in the reporting year. " * 3
+    assert compression.encode_content(content, db.cursor())[0] == compression.ZSTD_CODEC
+
+    samples = [f"Block {i}: {content}".encode() for i in range(200)]
+    dictionary = compression.zstandard.train_dictionary(4096, samples)
+    # Another process, such as the CLI, adds the dictionary
+    other = sqlite3.connect(DATABASE_URL)
+    with other:
+        dictionary_id = other.execute(
+            "INSERT INTO compression_dictionaries (dictionary, sample_count) VALUES (?, ?)",
+            (dictionary.as_bytes(), len(samples)),
+        ).lastrowid
+    other.close()
+
+    codec, value = compression.encode_content(content, db.cursor())
+    assert codec == f"{compression.ZSTD_CODEC}:{dictionary_id}"
+    assert compression.decode_content(codec, value, db.cursor()) == content
+
+
+def test_migration_re_encodes_blocks_and_version_history(client, login, monkeypatch):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    text = "Gross Scope 1 greenhouse gas emissions were 1,200 tCO2eq in the reporting year across all sites."
+    report = client.post("/api/files/upload-text", json={"text": text}, headers=headers).json()
+    # The first edit writes version 1 and version 2 to the history
+    edited = [{**report["blocks"][0], "content": text.replace("1,200", "1,350")}]
+    client.put(f"/api/files/reports/{report['id']}", json={"blocks": edited}, headers=headers)
+
+    monkeypatch.setattr(compression, "BLOCK_COMPRESSION", "zstd")
+    monkeypatch.setattr(compression, "_active_dictionary_expires", 0.0)
+    conn = sqlite3.connect(DATABASE_URL)
+    assert compression.migrate_block_content(conn) == 3
+    codecs = {row[0] for table in compression.CONTENT_TABLES
+              for row in conn.execute(f"SELECT content_codec FROM {table} WHERE content IS NOT NULL")}
+    conn.close()
+    assert codecs == {compression.ZSTD_CODEC}
+
+    version = client.get(f"/api/files/reports/{report['id']}/versions/1", headers=headers).json()
+    assert [block["content"] for block in version["blocks"]] == [text]
+    current = client.get(f"/api/files/reports/{report['id']}", headers=headers).json()
+    assert [block["content"] for block in current["blocks"]] == [edited[0]["content"]]
+
+
+def test_dictionary_is_trained_on_a_sample(db):
+    content = "Gross Scope {} greenhouse gas emissions were {:,} tCO2eq in the reporting year."
+    db.execute("INSERT INTO reports (id, user_id, title) VALUES ('r1', 1, 'report')")
+    db.executemany(
+        "INSERT INTO report_blocks (id, report_id, content, content_codec, block_order) VALUES (?, 'r1', ?, 'raw', ?)",
+        [(f"b{i}", content.format(i % 3 + 1, i * 37), i) for i in range(400)],
+    )
+    db.commit()
+
+    dictionary_id = compression.train_dictionary(db, sample_limit=300)
+    row = db.execute("SELECT sample_count FROM compression_dictionaries WHERE id = ?", (dictionary_id,)).fetchone()
+    assert row == (300,)
@@ -0,0 +1,70 @@
+# File: tests/test_export.py
+import json
+import sqlite3
+
+import core.compression as compression
+from core.config import DATABASE_URL
+
+SCOPE_1 = "Gross Scope 1 greenhouse gas emissions were 1,200 tCO2eq in the reporting year across all sites."
+WATER = "Water consumption in areas at water risk fell to 310 megalitres in the reporting year."
+
+
+def export(client, headers, granularity: str):
+    response = client.get(f"/api/files/export?granularity={granularity}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def upload_text(client, headers, text: str, title: str) -> dict:
+    return client.post("/api/files/upload-text", json={"text": text, "title": title}, headers=headers).json()
+
+
+def test_report_export(client, login):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    first = upload_text(client, headers, SCOPE_1, "First")
+    tagged = [{**first["blocks"][0], "tags": ["esrs:GrossScope1GreenhouseGasEmissions"]}]
+    client.put(f"/api/files/reports/{first['id']}", json={"blocks": tagged}, headers=headers)
+    second = upload_text(client, headers, WATER, "Second")
+
+    reports = export(client, headers, "report")
+    assert [report["id"] for report in reports] == [second["id"], first["id"]]
+    assert reports[1]["title"] == "First"
+    assert reports[1]["blocks"] == tagged
+    assert reports[0]["blocks"] == [{**second["blocks"][0], "tags": []}]
+
+
+def test_block_export(client, login):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    report = upload_text(client, headers, f"{SCOPE_1}\n\n{WATER}", "Report")
+
+    blocks = export(client, headers, "block")
+    assert [block["report_id"] for block in blocks] == [report["id"]] * 2
+    assert [block["content"] for block in blocks] == [SCOPE_1, WATER]
+
+
+def test_report_without_blocks(client, login):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    report = upload_text(client, headers, SCOPE_1, "Emptied")
+    client.put(f"/api/files/reports/{report['id']}", json={"blocks": []}, headers=headers)
+
+    assert [(r["id"], r["blocks"]) for r in export(client, headers, "report")] == [(report["id"], [])]
+    assert export(client, headers, "block") == []
+
+
+def test_compressed_content_is_exported_as_text(client, login, monkeypatch):
+    monkeypatch.setattr(compression, "BLOCK_COMPRESSION", "zstd")
+    monkeypatch.setattr(compression, "_active_dictionary_expires", 0.0)
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    upload_text(client, headers, SCOPE_1, "Compressed")
+
+    db = sqlite3.connect(DATABASE_URL)
+    codecs = [row[0] for row in db.execute("SELECT content_codec FROM report_blocks")]
+    db.close()
+    assert codecs == [compression.ZSTD_CODEC]
+    assert [block["content"] for block in export(client, headers, "block")] == [SCOPE_1]
+
+
+def test_invalid_granularity(client, login):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    assert client.get("/api/files/export?granularity=page", headers=headers).status_code == 400
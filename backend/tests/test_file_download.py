@@ -0,0 +1,42 @@
+# File: tests/test_file_download.py
+from email.utils import formatdate, parsedate_to_datetime
+
+import pytest
+
+from conftest import DOCX_TYPE, docx_bytes
+
+
+@pytest.fixture
+def uploaded(client, login):
+    """Path of the original file of an uploaded report and the headers to fetch it"""
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    content = docx_bytes("Scope 1 emissions in 2024 were 1,200 tCO2eq.")
+    response = client.post("/api/files/upload", files={"file": ("report.docx", content, DOCX_TYPE)}, headers=headers)
+    assert response.status_code == 200
+    return f"/api/files/reports/{response.json()['id']}/file", headers, content
+
+
+def test_head_returns_headers_without_body(client, uploaded):
+    path, headers, content = uploaded
+    response = client.head(path, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-length"] == str(len(content))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.content == b""
+
+
+def test_if_range_date_in_other_http_format_matches(client, uploaded):
+    path, headers, content = uploaded
+    last_modified = client.head(path, headers=headers).headers["last-modified"]
+    # RFC 850 form of the same instant
+    rfc850 = parsedate_to_datetime(last_modified).strftime("%A, %d-%b-%y %H:%M:%S GMT")
+    response = client.get(path, headers={**headers, "Range": "bytes=0-9", "If-Range": rfc850})
+    assert response.status_code == 206
+    assert response.content == content[:10]
+
+
+def test_if_range_stale_date_sends_whole_file(client, uploaded):
+    path, headers, content = uploaded
+    response = client.get(path, headers={**headers, "Range": "bytes=0-9", "If-Range": formatdate(0, usegmt=True)})
+    assert response.status_code == 200
+    assert response.content == content
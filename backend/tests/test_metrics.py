@@ -0,0 +1,56 @@
+# File: tests/test_metrics.py
+import sqlite3
+
+from core.write_queue import connect, query_label
+
+
+def test_metrics_require_admin(client, login, admin_headers):
+    assert client.get("/metrics").status_code in (401, 403)
+    user_headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    assert client.get("/metrics", headers=user_headers).status_code == 403
+    assert client.get("/metrics", headers=admin_headers).status_code == 200
+
+
+def test_queries_are_labelled_from_their_sql(client, admin_headers):
+    body = client.get("/metrics", headers=admin_headers).text
+    assert 'sql_query_duration_seconds_count{query="select_users"}' in body
+    assert 'sql_query_duration_seconds_count{query="insert_refresh_tokens"}' in body
+
+
+def test_query_label():
+    assert query_label("SELECT rb.id FROM report_blocks rb JOIN reports r ON r.id = rb.report_id") == "select_report_blocks"
+    assert query_label("\n    INSERT OR REPLACE INTO block_signatures (block_id) VALUES (?)") == "insert_block_signatures"
+    assert query_label("UPDATE reports SET title = ?") == "update_reports"
+    assert query_label("BEGIN IMMEDIATE") == "begin"
+
+
+def test_query_label_skips_subqueries():
+    sql = """
+        SELECT r.id, (SELECT json_group_array(tag) FROM block_tags WHERE block_id = rb.id)
+        FROM reports r LEFT JOIN report_blocks rb ON rb.report_id = r.id
+    """
+    assert query_label(sql) == "select_reports"
+    assert query_label("DELETE FROM block_tags WHERE block_id IN (SELECT id FROM report_blocks WHERE report_id = ?)") == "delete_block_tags"
+
+
+def test_fetch_time_is_part_of_the_observation(tmp_path):
+    from prometheus_client import REGISTRY
+
+    def count():
+        return REGISTRY.get_sample_value("sql_query_duration_seconds_count", {"query": "select_numbers"}) or 0
+
+    conn = connect(str(tmp_path / "metrics.db"))
+    assert isinstance(conn, sqlite3.Connection)
+    conn.execute("CREATE TABLE numbers (n INTEGER)")
+    conn.executemany("INSERT INTO numbers VALUES (?)", [(n,) for n in range(10)])
+    before = count()
+
+    cursor = conn.execute("SELECT n FROM numbers")
+    assert count() == before
+    assert cursor.fetchmany(4) and count() == before
+    assert len(cursor.fetchall()) == 6
+    assert count() == before + 1
+
+    assert [row for row in conn.execute("SELECT n FROM numbers")] == [(n,) for n in range(10)]
+    assert count() == before + 2
+    conn.close()
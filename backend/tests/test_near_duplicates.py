@@ -0,0 +1,53 @@
+# File: tests/test_near_duplicates.py
+import uuid
+from datetime import datetime
+
+from core.config import NEAR_DUPLICATE_THRESHOLD
+from core.minhash import compute_signature, estimate_similarity
+from model import ReportBlock, ReportDocument
+
+SCOPE_1 = "Gross Scope 1 greenhouse gas emissions for the reporting year 2024 were 1,300 tCO2eq across all sites."
+SCOPE_3 = "Gross Scope 3 greenhouse gas emissions for the reporting year 2024 were 48,900 tCO2eq across all sites."
+SCOPE_1_TAG = "esrs:GrossScope1GreenhouseGasEmissions"
+
+
+def report(*blocks: ReportBlock) -> ReportDocument:
+    now = datetime.now().isoformat()
+    return ReportDocument(id=str(uuid.uuid4()), title="report", created_at=now, updated_at=now, blocks=list(blocks))
+
+
+def block(content: str, tags=()) -> ReportBlock:
+    return ReportBlock(id=str(uuid.uuid4()), content=content, type="paragraph", tags=list(tags))
+
+
+def test_figures_are_masked_but_scope_numbers_are_not():
+    next_year = SCOPE_1.replace("2024", "2025").replace("1,300", "1,412.5")
+    assert estimate_similarity(compute_signature(SCOPE_1), compute_signature(next_year)) == 1.0
+    assert estimate_similarity(compute_signature(SCOPE_1), compute_signature(SCOPE_3)) < NEAR_DUPLICATE_THRESHOLD
+
+
+def test_near_duplicate_block_inherits_tags(client, login):
+    import database
+
+    login()
+    database.create_report(report(block(SCOPE_1, [SCOPE_1_TAG])), 1, None)
+
+    next_year = report(block(SCOPE_1.replace("2024", "2025").replace("1,300", "1,250")), block("Introduction"))
+    database.create_report(next_year, 1, None)
+    assert [b.tags for b in next_year.blocks] == [[SCOPE_1_TAG], []]
+
+    db = database.connect()
+    stored = database.get_report_by_id(next_year.id, 1, db)
+    db.close()
+    assert [b.tags for b in stored.blocks] == [[SCOPE_1_TAG], []]
+
+
+def test_other_scope_does_not_inherit_tags(client, login):
+    import database
+
+    login()
+    database.create_report(report(block(SCOPE_1, [SCOPE_1_TAG])), 1, None)
+
+    scope_3 = report(block(SCOPE_3))
+    database.create_report(scope_3, 1, None)
+    assert scope_3.blocks[0].tags == []
@@ -0,0 +1,24 @@
+# File: tests/test_profiling.py
+import pytest
+
+
+@pytest.mark.parametrize("value", ["1", "true", "Yes", "on"])
+def test_truthy_header_profiles_request(client, admin_headers, value):
+    response = client.get("/me", headers={**admin_headers, "X-Profile": value})
+    assert response.status_code == 200
+    assert "X-Profile-Id" in response.headers
+
+
+@pytest.mark.parametrize("value", ["0", "false", "no", "off", ""])
+def test_other_header_values_do_not_profile(client, admin_headers, value):
+    response = client.get("/me", headers={**admin_headers, "X-Profile": value})
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_profiled_request_runs_threadpool_work(client, admin_headers):
+    # Threadpool calls start a second profiler, which Python 3.12+ refuses while the request's is on
+    response = client.post("/api/files/upload-text", json={"text": "Scope 1 emissions were 1,200 tCO2eq."},
+                           headers={**admin_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert "X-Profile-Id" in response.headers
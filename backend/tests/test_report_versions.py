@@ -0,0 +1,51 @@
+# File: tests/test_report_versions.py
+import time
+
+import pytest
+
+
+@pytest.fixture
+def headers(login):
+    return {"Authorization": f"Bearer {login()['access_token']}"}
+
+
+def upload(client, headers, text: str) -> dict:
+    response = client.post("/api/files/upload-text", json={"title": "versions", "text": text}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_duplicate_block_ids_are_rejected(client, headers):
+    report = upload(client, headers, "Scope 1 emissions were 1,200 tCO2eq.")
+    block = report["blocks"][0]
+    response = client.put(f"/api/files/reports/{report['id']}", json={"blocks": [block, {**block, "content": "x"}]},
+                          headers=headers)
+    assert response.status_code == 400
+
+
+def test_block_id_of_another_report_conflicts(client, headers):
+    first = upload(client, headers, "Scope 1 emissions were 1,200 tCO2eq.")
+    second = upload(client, headers, "Scope 2 emissions were 800 tCO2eq.")
+    stolen = {**first["blocks"][0], "content": "Copied block"}
+    response = client.put(f"/api/files/reports/{second['id']}", json={"blocks": second["blocks"] + [stolen]},
+                          headers=headers)
+    assert response.status_code == 409
+
+    # Neither report changed
+    assert client.get(f"/api/files/reports/{first['id']}", headers=headers).json()["blocks"] == first["blocks"]
+    assert client.get(f"/api/files/reports/{second['id']}", headers=headers).json()["blocks"] == second["blocks"]
+
+
+def test_first_version_keeps_the_report_creation_time(client, headers):
+    report = upload(client, headers, "Scope 1 emissions were 1,200 tCO2eq.")
+    # The stored creation time, not the one in the upload response
+    created_at = client.get(f"/api/files/reports/{report['id']}", headers=headers).json()["created_at"]
+    time.sleep(1)
+    blocks = [{**report["blocks"][0], "content": "Scope 1 emissions were 1,300 tCO2eq."}]
+    assert client.put(f"/api/files/reports/{report['id']}", json={"blocks": blocks}, headers=headers).status_code == 200
+
+    versions = client.get(f"/api/files/reports/{report['id']}/versions", headers=headers).json()
+    assert [version["version"] for version in versions] == [2, 1]
+    assert versions[1]["created_at"] == created_at
+    assert versions[0]["created_at"] != created_at
+    assert client.get(f"/api/files/reports/{report['id']}/versions/1", headers=headers).json()["blocks"] == report["blocks"]
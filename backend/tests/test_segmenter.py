@@ -0,0 +1,56 @@
+# File: tests/test_segmenter.py
+from core.segmenter import iter_text_lines, segment_lines
+
+
+def segments(text: str):
+    return list(segment_lines(iter_text_lines(text)))
+
+
+def test_headings():
+    text = "\n".join([
+        "1.2 Climate Change Mitigation",
+        "The group reduced its energy use across all production sites in the reporting year.",
+        "",
+        "ENVIRONMENTAL INFORMATION",
+        "E1-6 Gross Scopes 1, 2, 3 and Total GHG emissions",
+    ])
+    assert segments(text) == [
+        ("heading", "1.2 Climate Change Mitigation"),
+        ("paragraph", "The group reduced its energy use across all production sites in the reporting year."),
+        ("heading", "ENVIRONMENTAL INFORMATION"),
+        ("heading", "E1-6 Gross Scopes 1, 2, 3 and Total GHG emissions"),
+    ]
+
+
+def test_heading_is_not_taken_from_mid_sentence():
+    text = "Emissions are reported for all sites operated by\nThe Group Holding Company in Europe."
+    assert segments(text) == [
+        ("paragraph", "Emissions are reported for all sites operated by The Group Holding Company in Europe."),
+    ]
+
+
+def test_list_items():
+    text = "\n".join([
+        "• Scope 1 emissions from owned vehicles and",
+        "boilers at the main plant.",
+        "- Scope 2 emissions from purchased electricity.",
+        "1) Scope 3 emissions from business travel.",
+    ])
+    assert segments(text) == [
+        ("list", "• Scope 1 emissions from owned vehicles and boilers at the main plant."),
+        ("list", "- Scope 2 emissions from purchased electricity."),
+        ("list", "1) Scope 3 emissions from business travel."),
+    ]
+
+
+def test_table_rows():
+    text = "\n".join([
+        "Scope\t2023\t2024",
+        "Scope 1 | 1,200 | 1,300",
+        "Energy 4,100 3,950 (3.7%)",
+    ])
+    assert segments(text) == [
+        ("table", "Scope | 2023 | 2024"),
+        ("table", "Scope 1 | 1,200 | 1,300"),
+        ("table", "Energy 4,100 3,950 (3.7%)"),
+    ]
@@ -0,0 +1,93 @@
+# File: tests/test_upload.py
+import sqlite3
+
+import database
+import routes.file_upload_routes as file_upload_routes
+from conftest import DOCX_TYPE, docx_bytes
+from core.config import DATABASE_URL
+
+PARAGRAPHS = [f"Paragraph {n} covers site {n * 7} and its water use in 2024." for n in range(7)]
+
+
+def upload(client, headers, content):
+    return client.post("/api/files/upload", files={"file": ("report.docx", content, DOCX_TYPE)}, headers=headers)
+
+
+def stored_blocks() -> int:
+    db = sqlite3.connect(DATABASE_URL)
+    count = db.execute("SELECT COUNT(*) FROM report_blocks").fetchone()[0]
+    db.close()
+    return count
+
+
+def test_upload_streams_blocks_in_batches(client, login, monkeypatch):
+    monkeypatch.setattr(database, "BLOCK_INSERT_BATCH_SIZE", 2)
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+
+    response = upload(client, headers, docx_bytes(*PARAGRAPHS))
+    assert response.status_code == 200
+    report = response.json()
+    assert [block["content"] for block in report["blocks"]] == PARAGRAPHS
+
+    stored = client.get(f"/api/files/reports/{report['id']}", headers=headers).json()
+    assert [block["id"] for block in stored["blocks"]] == [block["id"] for block in report["blocks"]]
+
+
+def test_upload_without_text_is_rejected(client, login):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    assert upload(client, headers, docx_bytes()).status_code == 400
+    assert client.get("/api/files/reports", headers=headers).json() == []
+
+
+def test_failed_upload_leaves_no_blocks(client, login, monkeypatch):
+    monkeypatch.setattr(database, "BLOCK_INSERT_BATCH_SIZE", 2)
+    segment = file_upload_routes.iter_blocks
+
+    def failing_blocks(lines):
+        for n, block in enumerate(segment(lines)):
+            if n == 5:
+                raise ValueError("segmenter failed")
+            yield block
+
+    monkeypatch.setattr(file_upload_routes, "iter_blocks", failing_blocks)
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+
+    assert upload(client, headers, docx_bytes(*PARAGRAPHS)).status_code == 500
+    assert client.get("/api/files/reports", headers=headers).json() == []
+    assert stored_blocks() == 0
+
+
+def unfinished_upload(user_id: int) -> str:
+    """Blocks committed by a streaming upload whose report row was never written"""
+    from core.minhash import compute_signature
+    from core.write_queue import execute_write
+    from model import ReportBlock
+
+    report_id = "unfinished"
+    block = ReportBlock(id="b1", content=PARAGRAPHS[0], type="paragraph", tags=["esrs:WaterConsumption"])
+    execute_write(database._insert_report_batch, report_id, [block], 0, user_id, [compute_signature(block.content)])
+    return report_id
+
+
+def test_unfinished_upload_is_not_a_tag_donor(client, login):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    unfinished_upload(1)
+
+    report = client.post("/api/files/upload-text", json={"text": PARAGRAPHS[0]}, headers=headers).json()
+    assert report["blocks"][0]["tags"] == []
+
+
+def test_blocks_of_unfinished_uploads_are_collected(client, login):
+    login()
+    unfinished_upload(1)
+    assert database.collect_orphaned_blocks() == 0
+    assert stored_blocks() == 1
+
+    db = sqlite3.connect(DATABASE_URL)
+    with db:
+        db.execute("UPDATE report_blocks SET created_at = datetime('now', '-2 hours')")
+    assert database.collect_orphaned_blocks() == 1
+    counts = [db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("report_blocks", "block_tags", "block_signatures", "block_lsh_buckets")]
+    db.close()
+    assert counts == [0, 0, 0, 0]
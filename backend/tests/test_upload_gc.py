@@ -0,0 +1,38 @@
+# File: tests/test_upload_gc.py
+import os
+
+from conftest import DOCX_TYPE, docx_bytes
+from core.config import UPLOAD_DIRECTORY
+from core.upload_cleanup import collect_orphaned_uploads
+
+
+def old_file(name: str) -> str:
+    path = os.path.join(UPLOAD_DIRECTORY, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * 10)
+    os.utime(path, (0, 0))
+    return path
+
+
+def test_refuses_when_no_report_references_an_upload(client):
+    path = old_file("stray.pdf")
+    stats = collect_orphaned_uploads()
+    assert stats["refused"] and stats["removed"] == 0
+    assert os.path.exists(path)
+
+    stats = collect_orphaned_uploads(force=True)
+    assert not stats["refused"] and stats["removed"] == 1
+    assert not os.path.exists(path)
+
+
+def test_removes_only_unreferenced_uploads(client, login):
+    headers = {"Authorization": f"Bearer {login()['access_token']}"}
+    content = docx_bytes("Scope 1 emissions in 2024 were 1,200 tCO2eq.")
+    response = client.post("/api/files/upload", files={"file": ("report.docx", content, DOCX_TYPE)}, headers=headers)
+    kept = response.json()["file_path"]
+    os.utime(kept, (0, 0))
+    orphan = old_file("orphan.pdf")
+
+    stats = collect_orphaned_uploads()
+    assert stats["removed"] == 1
+    assert os.path.exists(kept) and not os.path.exists(orphan)
@@ -0,0 +1,18 @@
+# File: tests/test_write_queue.py
+import pytest
+
+from core.write_queue import WriteQueue, execute_write
+
+
+def synchronous(cursor) -> int:
+    return cursor.execute("PRAGMA synchronous").fetchone()[0]
+
+
+def test_commits_are_synced_by_default(client):
+    # 2 is FULL
+    assert execute_write(synchronous) == 2
+
+
+def test_unknown_synchronous_mode_is_rejected():
+    with pytest.raises(ValueError):
+        WriteQueue(synchronous="SOMETIMES")